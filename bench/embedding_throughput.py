@@ -0,0 +1,144 @@
+"""
+Embedding throughput: Ollama (HTTP) vs. the in-process ONNX backend.
+
+Chunks the bundled PDFs exactly like ingestion.py, then embeds them with
+each backend in ingestion-sized calls (uncached), and times single-query
+latency sequentially and from concurrent threads. When both ONNX variants
+run, the int8 model's agreement with fp32 is reported as cosine similarity.
+
+    python bench/embedding_throughput.py --backends ollama,onnx-fp32,onnx-int8 --threads 1,4
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "src"))
+sys.path.insert(0, BENCH_DIR)
+
+from run_benchmarks import QUERIES, git_commit, percentile  # noqa: E402
+
+
+def load_chunks(pdf_dir, limit):
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    from ingestion import parse_pdfs
+
+    paths = sorted(os.path.join(pdf_dir, f) for f in os.listdir(pdf_dir) if f.lower().endswith(".pdf"))
+    # Same splitter settings as ingestion.py
+    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50, length_function=len, is_separator_regex=False)
+    chunks = [chunk.page_content for chunk in splitter.split_documents(parse_pdfs(paths))]
+    return chunks[:limit] if limit else chunks
+
+
+def make_backend(name, threads):
+    if name == "ollama":
+        from langchain_ollama import OllamaEmbeddings
+        from embedding_cache import EMBEDDING_MODEL
+        return OllamaEmbeddings(model=EMBEDDING_MODEL)
+    from onnx_embeddings import OnnxEmbeddings
+    return OnnxEmbeddings(quantize=name == "onnx-int8", threads=threads)
+
+
+def measure(backend, chunks, batch_size, query_runs, query_threads):
+    backend.embed_documents(chunks[:8])  # warm-up (model load, first-call allocations)
+
+    batch_latencies, vectors = [], []
+    started = time.perf_counter()
+    for i in range(0, len(chunks), batch_size):
+        t0 = time.perf_counter()
+        vectors.extend(backend.embed_documents(chunks[i:i + batch_size]))
+        batch_latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+
+    queries = [QUERIES[i % len(QUERIES)] + f" #{i}" for i in range(query_runs)]
+    query_latencies = []
+    for query in queries:
+        t0 = time.perf_counter()
+        backend.embed_query(query)
+        query_latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=query_threads) as pool:
+        list(pool.map(backend.embed_query, queries))
+    concurrent_elapsed = time.perf_counter() - t0
+
+    return vectors, {
+        "chunks": len(chunks),
+        "seconds": round(elapsed, 3),
+        "chunks_per_s": round(len(chunks) / elapsed, 2) if elapsed else None,
+        "batch_p50_ms": round(percentile(batch_latencies, 50) * 1000, 2),
+        "batch_p90_ms": round(percentile(batch_latencies, 90) * 1000, 2),
+        "query_p50_ms": round(percentile(query_latencies, 50) * 1000, 2),
+        "query_p90_ms": round(percentile(query_latencies, 90) * 1000, 2),
+        "concurrent_queries_per_s": round(query_runs / concurrent_elapsed, 2) if concurrent_elapsed else None,
+    }
+
+
+def agreement(a, b):
+    import numpy as np
+
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    cosine = (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1) + 1e-12)
+    return {"mean_cosine": round(float(cosine.mean()), 5), "min_cosine": round(float(cosine.min()), 5)}
+
+
+def main():
+    from ingestion import BATCH_SIZE
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--pdf-dir", default=os.path.join(PROJECT_ROOT, "data", "raw_pdfs"))
+    parser.add_argument("--backends", default="ollama,onnx-fp32,onnx-int8")
+    parser.add_argument("--threads", default=str(os.cpu_count() or 1), help="comma-separated ONNX thread counts")
+    parser.add_argument("--limit", type=int, default=0, help="embed at most this many chunks (0 = all)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="texts per embed_documents call")
+    parser.add_argument("--query-runs", type=int, default=50)
+    parser.add_argument("--query-threads", type=int, default=8)
+    args = parser.parse_args()
+
+    chunks = load_chunks(args.pdf_dir, args.limit)
+    print(f"[bench] {len(chunks)} chunks from {args.pdf_dir}", file=sys.stderr)
+
+    results, vectors = {}, {}
+    for name in args.backends.split(","):
+        thread_counts = [None] if name == "ollama" else [int(t) for t in args.threads.split(",")]
+        for threads in thread_counts:
+            label = name if threads is None else f"{name}/threads={threads}"
+            print(f"[bench] {label}", file=sys.stderr)
+            try:
+                backend = make_backend(name, threads)
+                vectors[name], results[label] = measure(
+                    backend, chunks, args.batch_size, args.query_runs, args.query_threads
+                )
+            except Exception as e:  # e.g. no Ollama server running
+                results[label] = {"error": str(e)}
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "batch_size": args.batch_size,
+        "backends": results,
+    }
+    if "onnx-fp32" in vectors and "onnx-int8" in vectors:
+        report["int8_vs_fp32"] = agreement(vectors["onnx-fp32"], vectors["onnx-int8"])
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        print(f"[bench] report written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
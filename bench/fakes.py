@@ -0,0 +1,144 @@
+"""
+Deterministic local stand-ins for Ollama, DuckDuckGo and live RSS feeds,
+used by the offline benchmark suite.
+"""
+import re
+import json
+import math
+import time
+import hashlib
+import threading
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Feature-hashed bag of words, L2-normalised; same dimension as nomic-embed-text.
+    Each embed call sleeps `latency` seconds; query embeddings are counted.
+    """
+
+    def __init__(self, dim=768, latency=0.0):
+        self.dim = dim
+        self.latency = latency
+        self.query_calls = 0
+
+    def _embed(self, text):
+        vector = [0.0] * self.dim
+        for token in re.findall(r"\w+", text.lower()):
+            digest = int(hashlib.md5(token.encode("utf-8")).hexdigest(), 16)
+            vector[digest % self.dim] += 1.0 if (digest >> 64) & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts):
+        time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        self.query_calls += 1
+        time.sleep(self.latency)
+        return self._embed(text)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model with a fixed per-call latency.
+    Tool-bound calls request every bound tool with the user's topic as query;
+    the Analyst and Writer prompts get deterministic text/HTML derived from the prompt.
+    When streamed (e.g. LangGraph's "messages" mode), text replies arrive word by word.
+    """
+
+    latency: float = 0.05
+
+    @property
+    def _llm_type(self):
+        return "fake-chat"
+
+    @property
+    def _identifying_params(self):
+        return {"latency": self.latency}
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[getattr(t, "name", str(t)) for t in tools], **kwargs)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        prompt = messages[-1].content if messages else ""
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+        if kwargs.get("tools"):
+            topic = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), prompt)
+            message = AIMessage(
+                content="",
+                tool_calls=[
+                    {"name": name, "args": {"query": topic}, "id": f"call_{i}"}
+                    for i, name in enumerate(kwargs["tools"])
+                ],
+            )
+        elif "SECTION HTML:" in prompt:
+            section = prompt.split("SECTION HTML:", 1)[1].strip()
+            message = AIMessage(content=f"{section}\n<p>Revised ({digest[:8]}).</p>\n")
+        elif "newsletter editor" in prompt:
+            sections = "".join(
+                f"<h2>Section {i + 1}</h2>\n<p>Insight {digest[i * 8:(i + 1) * 8]} from the analysis.</p>\n"
+                for i in range(3)
+            )
+            message = AIMessage(content=f"<html><body>\n<h1>NewsNexus Weekly</h1>\n{sections}</body></html>")
+        else:
+            figures = re.findall(r"\d+(?:\.\d+)?%", prompt)[:5]
+            message = AIMessage(
+                content=f"Trends ({digest[:8]}):\n" + "\n".join(f"- Figure cited: {f}" for f in figures)
+            )
+
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        message = self._generate(messages, stop, **kwargs).generations[0].message
+        if message.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+                for i, call in enumerate(message.tool_calls)
+            ]))
+            return
+        # BaseChatModel reports each chunk to the callbacks (on_llm_new_token) itself
+        for token in re.findall(r"\S+\s*|\s+", message.content):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+class FakeSearchBackend:
+    """Web search backend answering from a fixture file, ranked by word overlap."""
+
+    def __init__(self, path, latency=0.0):
+        with open(path, "r", encoding="utf-8") as f:
+            self.results = json.load(f)["results"]
+        self.latency = latency
+        self.calls = 0
+
+    def search(self, query, max_results):
+        self.calls += 1
+        time.sleep(self.latency)
+        words = set(re.findall(r"\w+", query.lower()))
+        ranked = sorted(
+            self.results,
+            key=lambda r: len(words & set(re.findall(r"\w+", (r["title"] + " " + r["body"]).lower()))),
+            reverse=True,
+        )
+        return ranked[:max_results]
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_fixtures(directory):
+    """Serves a directory over HTTP on a free local port (with Last-Modified/304 support)."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_QuietHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, name="fixture-server", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
@@ -0,0 +1,274 @@
+"""
+Offline end-to-end benchmarks for NewsNexus.
+
+Runs ingestion, retrieval, the agents.app graph, the phase-5 HITL graph, the
+Streamlit review flow (resume from checkpoint with streamed revision) and
+the archive "have we covered this?" check against local stand-ins (fake chat model, hashing embedder, fixture feeds
+and search results) in a scratch data directory, and reports per-stage
+latency percentiles, throughput and peak memory as JSON. Tracing is off while
+stages are timed; progress and app logs go to stderr, so stdout carries only
+the report.
+
+    python bench/run_benchmarks.py --output bench_results.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+SRC_DIR = os.path.join(PROJECT_ROOT, "src")
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+
+QUERIES = [
+    "What is the impact of GenAI on productivity?",
+    "generative AI adoption in Hong Kong banks",
+    "economic impact of generative AI",
+    "risks of AI in banking regulation",
+    "customer service chatbots in retail banking",
+]
+TOPICS = [
+    "Impact of Generative AI on Banking sector 2024",
+    "latest AI trends and internal productivity reports",
+    "AI regulation for financial services",
+]
+# Archive check: paraphrases of archived topics (should match) and unseen topics
+MEMORY_QUERIES = [
+    "impact of generative AI on the banking sector in 2024",
+    "Latest AI trends & internal productivity reports",
+    "AI regulation for financial services firms",
+    "quantum computing in supply chain logistics",
+    "carbon markets and ESG disclosure rules",
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_stage(name, fn, runs, items_per_run=None):
+    """
+    Calls fn(i) `runs` times; returns latency percentiles, throughput and the
+    process's peak RSS so far (a high-water mark, so it only grows stage to stage).
+    """
+    print(f"[bench] {name} x{runs}", file=sys.stderr)
+    latencies, items = [], 0
+    started = time.perf_counter()
+    for i in range(runs):
+        t0 = time.perf_counter()
+        result = fn(i)
+        latencies.append(time.perf_counter() - t0)
+        items += items_per_run(result) if items_per_run else 1
+    elapsed = time.perf_counter() - started
+
+    return {
+        "runs": runs,
+        "items": items,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p90_ms": round(percentile(latencies, 90) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / runs * 1000, 3),
+        "max_ms": round(max(latencies) * 1000, 3),
+        "throughput_per_s": round(items / elapsed, 3) if elapsed else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=PROJECT_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--runs", type=int, default=5, help="repetitions per stage")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per fake LLM call")
+    parser.add_argument("--search-latency", type=float, default=0.0, help="seconds per fake web search")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="seconds per fake embedding call")
+    parser.add_argument("--vector-backend", choices=["chroma", "flat"], default="chroma",
+                        help="library vector index used by retrieval")
+    parser.add_argument("--archive-size", type=int, default=100, help="archived newsletters for the memory check")
+    parser.add_argument("--pdf-dir", default=os.path.join(PROJECT_ROOT, "data", "raw_pdfs"))
+    parser.add_argument("--keep", action="store_true", help="keep the scratch data directory")
+    args = parser.parse_args()
+
+    # App code prints progress (ingestion, memory); keep stdout for the report
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run_benchmarks(args)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        print(f"[bench] report written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+def run_benchmarks(args):
+    # Everything the app writes goes to a scratch directory; must be set before importing src modules
+    scratch = tempfile.mkdtemp(prefix="newsnexus-bench-")
+    shutil.copytree(args.pdf_dir, os.path.join(scratch, "raw_pdfs"))
+
+    from fakes import FakeChatModel, FakeSearchBackend, HashingEmbeddings, serve_fixtures
+
+    server, base_url = serve_fixtures(os.path.join(FIXTURES_DIR, "feeds"))
+    feeds = sorted(os.listdir(os.path.join(FIXTURES_DIR, "feeds")))
+    os.environ["NEWSNEXUS_DATA_DIR"] = scratch
+    os.environ["NEWSNEXUS_VECTOR_BACKEND"] = args.vector_backend
+    os.environ["NEWSNEXUS_RSS_FEEDS"] = ",".join(f"{base_url}/{name}" for name in feeds)
+    # Span export would add file writes to every timed call
+    os.environ["NEWSNEXUS_TRACING"] = "0"
+    sys.path.insert(0, SRC_DIR)
+
+    import resources
+    from embedding_cache import set_embedding_function
+    from web_search import set_web_search_backend
+
+    embeddings = HashingEmbeddings(latency=args.embed_latency)
+    set_embedding_function(embeddings)
+    resources.set_chat_model_factory(lambda: FakeChatModel(latency=args.llm_latency))
+    search_backend = FakeSearchBackend(os.path.join(FIXTURES_DIR, "search_results.json"), args.search_latency)
+    set_web_search_backend(search_backend)
+
+    from langchain_core.messages import HumanMessage
+    from ingestion import ingest_documents
+    from retrieval import retrieve_documents
+
+    stages = {}
+
+    stages["ingest_cold"] = run_stage("ingest_cold", lambda i: ingest_documents(), 1, items_per_run=lambda r: r[1])
+    stages["ingest_noop"] = run_stage("ingest_noop", lambda i: ingest_documents(), args.runs)
+    stages["retrieve"] = run_stage(
+        "retrieve", lambda i: retrieve_documents(QUERIES[i % len(QUERIES)], k=3), args.runs * len(QUERIES)
+    )
+
+    import agents
+    stages["graph_agents"] = run_stage(
+        "graph_agents",
+        lambda i: agents.app.invoke({
+            "messages": [HumanMessage(content=TOPICS[i % len(TOPICS)])],
+            "researcher_data": [],
+            "chart_data": [],
+        }),
+        args.runs,
+    )
+
+    import phase5_final
+
+    def hitl_round(i):
+        config = {"configurable": {"thread_id": f"bench_hitl_{i}"}}
+        topic = TOPICS[i % len(TOPICS)]
+        for _ in phase5_final.app.stream({"messages": [HumanMessage(content=topic)], "research_data": []}, config):
+            pass
+        phase5_final.app.update_state(config, {"messages": [HumanMessage(content="approve")]})
+        for _ in phase5_final.app.stream(None, config):
+            pass
+
+    stages["graph_hitl_phase5"] = run_stage("graph_hitl_phase5", hitl_round, args.runs)
+
+    # The Streamlit review flow: pause at human_approval, then resume with feedback from the
+    # checkpoint and stream the revision; a resumed revision that streams nothing is a failure
+    from agents import compile_review_app
+    from checkpointing import get_checkpointer
+    review_app = compile_review_app(get_checkpointer())
+
+    def review_round(i):
+        config = {"configurable": {"thread_id": f"bench_review_{i}"}}
+        topic = TOPICS[i % len(TOPICS)]
+        for _ in review_app.stream({"messages": [HumanMessage(content=topic)], "researcher_data": []}, config):
+            pass
+        review_app.update_state(config, {"messages": [HumanMessage(content="Make section 2 more formal")]})
+        tokens = 0
+        for mode, payload in review_app.stream(None, config, stream_mode=["updates", "messages"]):
+            if mode == "messages" and payload[1].get("langgraph_node") == "Writer" and payload[0].content:
+                tokens += 1
+        if not tokens:
+            raise RuntimeError("resumed review revision streamed no Writer tokens")
+        if "human_approval" not in review_app.get_state(config).next:
+            raise RuntimeError("revised draft did not pause for review again")
+        return tokens
+
+    stages["graph_review_resume"] = run_stage("graph_review_resume", review_round, args.runs, items_per_run=lambda r: r)
+
+    # Archive check: the old k-NN over whole newsletters vs. the MinHash/embedding topic index
+    from memory_store import get_memory_store
+    memory = get_memory_store()
+    seeds = TOPICS + QUERIES
+    for i in range(args.archive_size):
+        topic = f"{seeds[i % len(seeds)]} ({2000 + i // len(seeds)})"
+        memory.save_memory(topic, f"<html><body><h1>{topic}</h1><p>Issue {i} covering {topic}.</p></body></html>")
+
+    memory_runs = args.runs * len(MEMORY_QUERIES)
+    query_embeddings = {}
+    before = embeddings.query_calls
+    stages["memory_check_vector"] = run_stage(
+        "memory_check_vector",
+        lambda i: memory.vector_store.similarity_search_with_score(MEMORY_QUERIES[i % len(MEMORY_QUERIES)], k=3),
+        memory_runs,
+    )
+    query_embeddings["memory_check_vector"] = embeddings.query_calls - before
+    before = embeddings.query_calls
+    stages["memory_check_index"] = run_stage(
+        "memory_check_index", lambda i: memory.check_memory(MEMORY_QUERIES[i % len(MEMORY_QUERIES)]), memory_runs
+    )
+    query_embeddings["memory_check_index"] = embeddings.query_calls - before
+
+    from tool_cache import get_tool_cache
+    tool_cache = get_tool_cache()
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "runs": args.runs,
+            "llm_latency_s": args.llm_latency,
+            "search_latency_s": args.search_latency,
+            "embed_latency_s": args.embed_latency,
+            "vector_backend": args.vector_backend,
+            "archive_size": args.archive_size,
+            "pdfs": len([f for f in os.listdir(args.pdf_dir) if f.lower().endswith(".pdf")]),
+        },
+        "stages": stages,
+        "web_search_backend_calls": search_backend.calls,
+        "memory_query_embeddings": query_embeddings,
+        "semantic_tool_cache": tool_cache.stats() if tool_cache else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    server.shutdown()
+    if not args.keep:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return report
+
+
+if __name__ == "__main__":
+    main()
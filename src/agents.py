@@ -1,11 +1,14 @@
 import operator
-from typing import Annotated, List, TypedDict
+from typing import Annotated, List, Literal, TypedDict
 
 from langgraph.graph import StateGraph, END
-from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage
-from langchain_ollama import ChatOllama
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage, AIMessage
 
-from tools import get_llm_with_tools, lookup_policy_docs, web_search_stub, rss_feed_search
+from resources import get_chat_model
+from tracing import traced_node, traced_invoke
+from revision import revise_draft
+from analysis import fits_budget, map_reduce_analysis
+from tools import get_llm_with_tools, run_tool_calls
 
 
 # ----------------------------
@@ -15,43 +18,44 @@ class AgentState(TypedDict):
     messages: Annotated[list[BaseMessage], operator.add]
     researcher_data: List[str]
     chart_data: List[dict]
+    analysis: str
+    draft: str
 
 
 # ----------------------------
 # LLM Setup
 # ----------------------------
-llm_with_tools, tools = get_llm_with_tools()
-llm = ChatOllama(model="llama3.2", temperature=0)
+# Clients are created on first use, not at import, so loading the graph stays cheap
+def get_llm():
+    return get_chat_model()
+
+
+def get_tool_llm():
+    llm_with_tools, _ = get_llm_with_tools()
+    return llm_with_tools
 
 
 # ----------------------------
 # Researcher Node
 # ----------------------------
+@traced_node("Researcher")
 def researcher_node(state: AgentState):
     print("\n--- (Agent: Researcher) Gathering Data ---")
 
     last_message = state["messages"][-1]
     sys_msg = SystemMessage(content="You are a data gatherer. Use tools when needed.")
 
-    response = llm_with_tools.invoke([sys_msg, last_message])
+    response = traced_invoke(get_tool_llm(), [sys_msg, last_message], "researcher_llm")
     research_findings = []
 
     if hasattr(response, "tool_calls") and response.tool_calls:
-        for tool_call in response.tool_calls:
-            tool_name = tool_call["name"]
-            tool_args = tool_call["args"]
-
-            q = str(tool_args.get("query", ""))
-
-            if tool_name == "lookup_policy_docs":
-                res = lookup_policy_docs.invoke(q)
-            elif tool_name == "web_search_stub":
-                res = web_search_stub.invoke(q)
-            elif tool_name == "rss_feed_search":
-                res = rss_feed_search.invoke(q)
-            else:
-                res = "Unknown tool"
+        calls = [
+            (tool_call["name"], str(tool_call["args"].get("query", "")))
+            for tool_call in response.tool_calls
+        ]
 
+        # Tools are independent I/O calls, so run them concurrently
+        for tool_name, res in run_tool_calls(calls):
             research_findings.append(f"Source: {tool_name}\nData:\n{res}")
 
     return {
@@ -63,33 +67,50 @@ def researcher_node(state: AgentState):
 # ----------------------------
 # Analyst Node
 # ----------------------------
+@traced_node("Analyst")
 def analyst_node(state: AgentState):
     print("\n--- (Agent: Analyst) Extracting Insights ---")
 
-    raw_data = "\n\n".join(state.get("researcher_data", []))
+    findings = state.get("researcher_data", [])
+    raw_data = "\n\n".join(findings)
 
-    prompt = f"""
+    if not fits_budget(raw_data):
+        # Too much research for one call: analyse budget-sized batches, then merge
+        response = map_reduce_analysis(get_llm(), findings)
+    else:
+        prompt = f"""
 You are a senior analyst.
 Extract trends, patterns, and numeric insights from the data below.
 
 {raw_data}
 """
 
-    response = llm.invoke(prompt)
+        response = traced_invoke(get_llm(), prompt, "analyst_llm")
 
     return {
         "messages": [response],
-        "chart_data": []
+        "chart_data": [],
+        "analysis": response.content
     }
 
 
 # ----------------------------
 # Writer Node
 # ----------------------------
+@traced_node("Writer")
 def writer_node(state: AgentState):
+    last_message = state["messages"][-1]
+
+    # Reviewer feedback on an existing draft: revise only the sections it targets
+    if isinstance(last_message, HumanMessage) and state.get("draft"):
+        print("\n--- (Agent: Writer) Revising Draft Sections ---")
+        html, revised = revise_draft(get_llm(), state["draft"], last_message.content, state.get("analysis", ""))
+        print(f"   > Revised sections: {revised}")
+        return {"messages": [AIMessage(content=html)], "draft": html}
+
     print("\n--- (Agent: Writer) Creating HTML Newsletter ---")
 
-    analyst_insights = state["messages"][-1].content
+    analyst_insights = state.get("analysis") or last_message.content
 
     prompt = f"""
 You are a newsletter editor.
@@ -105,48 +126,58 @@ TRENDS & ANALYSIS:
 {analyst_insights}
 """
 
-    response = llm.invoke(prompt)
+    response = traced_invoke(get_llm(), prompt, "writer_llm")
 
-    return {"messages": [response]}
+    return {"messages": [response], "draft": response.content}
 
 
 # ----------------------------
-# Build Workflow
+# Human Review Gate
 # ----------------------------
-workflow = StateGraph(AgentState)
-
-workflow.add_node("Researcher", researcher_node)
-workflow.add_node("Analyst", analyst_node)
-workflow.add_node("Writer", writer_node)
+def human_approval_node(state: AgentState):
+    return state
 
-workflow.set_entry_point("Researcher")
 
-workflow.add_edge("Researcher", "Analyst")
-workflow.add_edge("Analyst", "Writer")
-workflow.add_edge("Writer", END)
+def route_after_human(state: AgentState) -> Literal["Writer", "__end__"]:
+    # Anything but an approval is feedback for the Writer
+    if "approve" in state["messages"][-1].content.lower():
+        return "__end__"
+    return "Writer"
 
-app = workflow.compile()
 
 # ----------------------------
-# Run Application
+# Build Workflow
 # ----------------------------
-if __name__ == "__main__":
-
-    user_topic = "latest AI trends and internal productivity reports"
-
-    inputs = {
-        "messages": [HumanMessage(content=user_topic)],
-        "researcher_data": [],
-        "chart_data": []
-    }
-
-    final_output = None
-
-    for step in app.stream(inputs):
-        print(step)
-
-        if "Writer" in step:
-            final_output = step["Writer"]["messages"][-1].content
-
-    print("\n\n=== Final Newsletter (HTML) ===\n")
-    print(final_output)
\ No newline at end of file
+def build_workflow(review=False):
+    """
+    Researcher -> Analyst -> Writer. With review=True the Writer hands over to
+    a human_approval node that ends the run on approval and loops back to the
+    Writer otherwise; compile it with a checkpointer and
+    interrupt_before=["human_approval"] to pause for the reviewer.
+    """
+    graph = StateGraph(AgentState)
+
+    graph.add_node("Researcher", researcher_node)
+    graph.add_node("Analyst", analyst_node)
+    graph.add_node("Writer", writer_node)
+
+    graph.set_entry_point("Researcher")
+
+    graph.add_edge("Researcher", "Analyst")
+    graph.add_edge("Analyst", "Writer")
+    if review:
+        graph.add_node("human_approval", human_approval_node)
+        graph.add_edge("Writer", "human_approval")
+        graph.add_conditional_edges("human_approval", route_after_human)
+    else:
+        graph.add_edge("Writer", END)
+    return graph
+
+
+def compile_review_app(checkpointer):
+    """The agents graph paused before human_approval, with its threads kept in `checkpointer`."""
+    return build_workflow(review=True).compile(checkpointer=checkpointer, interrupt_before=["human_approval"])
+
+
+workflow = build_workflow()
+app = workflow.compile()
@@ -0,0 +1,126 @@
+import re
+from contextvars import copy_context
+from concurrent.futures import ThreadPoolExecutor
+from tracing import traced_invoke
+
+# Research tokens per Analyst call; leaves room for the prompt and the answer in llama3.2's context
+ANALYST_TOKEN_BUDGET = 2000
+# count_tokens() is an estimate, so prompts are only filled to this share of the budget
+TOKEN_ESTIMATE_MARGIN = 0.85
+MAX_PARALLEL_EXTRACTS = 4
+MAX_REDUCE_ROUNDS = 3
+RECORD_SEPARATOR = "\n\n---\n\n"
+
+MAP_PROMPT = """
+You are a senior analyst.
+Extract trends, patterns, and numeric insights from the data below.
+Keep every figure, date and source link exactly as written. Be concise.
+
+{data}
+"""
+
+REDUCE_PROMPT = """
+You are a senior analyst.
+Below are partial analyses of one research set. Merge them into a single
+analysis of trends, patterns, and numeric insights. Remove repetition, keep
+every figure and source link.
+
+{data}
+"""
+
+
+def count_tokens(text):
+    """Cheap token estimate for Llama-style BPE (~4 characters or ~0.75 words per token)."""
+    return max(len(text) // 4, int(len(re.findall(r"\S+", text)) / 0.75))
+
+
+def fits_budget(text, budget=ANALYST_TOKEN_BUDGET):
+    """Whether text fits one Analyst call, with the estimate's safety margin."""
+    return count_tokens(text) <= int(budget * TOKEN_ESTIMATE_MARGIN)
+
+
+def _fit_extracts(extracts, budget):
+    """Shortens each extract to an equal share of `budget`, cutting at line breaks where possible."""
+    share = (budget - len(extracts)) // len(extracts)  # room for the joining blank lines
+    fitted = []
+    for text in extracts:
+        while count_tokens(text) > share:
+            cut = text.rfind("\n", 0, int(len(text) * 0.9))
+            text = text[:cut] if cut > 0 else text[:int(len(text) * 0.9)]
+        fitted.append(text)
+    return fitted
+
+
+def _split_finding(finding, budget):
+    """Splits one oversized finding on its record separators (then by size), keeping its Source header."""
+    header, _, body = finding.partition("\n")
+    pieces, current = [], ""
+    for record in body.split(RECORD_SEPARATOR):
+        while count_tokens(record) > budget:
+            cut = budget * 4
+            pieces.append(record[:cut])
+            record = record[cut:]
+        if current and count_tokens(current + RECORD_SEPARATOR + record) > budget:
+            pieces.append(current)
+            current = record
+        else:
+            current = f"{current}{RECORD_SEPARATOR}{record}" if current else record
+    if current:
+        pieces.append(current)
+    return [f"{header}\n{piece}" for piece in pieces]
+
+
+def partition_findings(findings, budget=ANALYST_TOKEN_BUDGET):
+    """Greedily packs findings into batches of at most `budget` tokens, in order."""
+    batches, current, used = [], [], 0
+    for finding in findings:
+        parts = [finding] if count_tokens(finding) <= budget else _split_finding(finding, budget)
+        for part in parts:
+            size = count_tokens(part)
+            if current and used + size > budget:
+                batches.append(current)
+                current, used = [], 0
+            current.append(part)
+            used += size
+    if current:
+        batches.append(current)
+    return batches
+
+
+def map_reduce_analysis(llm, findings, budget=ANALYST_TOKEN_BUDGET):
+    """
+    Map: extract insights from each budget-sized batch concurrently.
+    Reduce: merge the extracts, in budget-sized rounds until one answer remains.
+    Batches are packed to TOKEN_ESTIMATE_MARGIN of the budget. If the extracts
+    still exceed it after MAX_REDUCE_ROUNDS, each is shortened to an equal share
+    so the final call never gets an oversized prompt. Returns the final LLM message.
+    """
+    limit = int(budget * TOKEN_ESTIMATE_MARGIN)
+
+    def invoke(template, batch):
+        name = "analyst_map_llm" if template is MAP_PROMPT else "analyst_reduce_llm"
+        return traced_invoke(llm, template.format(data="\n\n".join(batch)), name)
+
+    def run_all(template, batches):
+        # Workers run in a copy of the caller's context so LangGraph callbacks still apply
+        with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_EXTRACTS, len(batches))) as pool:
+            futures = [pool.submit(copy_context().run, invoke, template, batch) for batch in batches]
+            return [future.result() for future in futures]
+
+    batches = partition_findings(findings, limit)
+    print(f"   > Map: {len(batches)} batches of <= {limit} tokens")
+    extracts = [message.content for message in run_all(MAP_PROMPT, batches)]
+
+    for _ in range(MAX_REDUCE_ROUNDS):
+        batches = partition_findings(extracts, limit)
+        if len(batches) == 1:
+            break
+        print(f"   > Reduce: {len(extracts)} extracts into {len(batches)} groups")
+        extracts = [message.content for message in run_all(REDUCE_PROMPT, batches)]
+
+    if count_tokens("\n\n".join(extracts)) > limit:
+        print(f"   > Reduce: extracts still over {limit} tokens after {MAX_REDUCE_ROUNDS} rounds, truncating each")
+        extracts = _fit_extracts(extracts, limit)
+
+    print("   > Reduce: merging extracts")
+    return invoke(REDUCE_PROMPT, extracts)
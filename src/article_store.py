@@ -0,0 +1,117 @@
+import os
+import time
+import sqlite3
+import threading
+from lexical_index import BM25Index
+from config import data_path
+
+# Configuration
+ARTICLE_DB_PATH = data_path("rss_articles.sqlite")
+
+
+class ArticleStore:
+    """
+    Persistent archive of RSS entries, deduplicated by GUID (or link).
+    Articles and their BM25 postings (title + summary) live in the same
+    SQLite file, so opening the store reads nothing up front and ranked
+    lookups never rescan the archive.
+    """
+
+    def __init__(self, path=ARTICLE_DB_PATH):
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS articles ("
+            " id TEXT PRIMARY KEY, feed TEXT, title TEXT, link TEXT, summary TEXT,"
+            " published REAL, first_seen REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+        self.index = BM25Index(path=None, conn=self.conn)
+        # Archives written before the index was persisted are indexed once
+        if len(self.index) == 0:
+            rows = self.conn.execute("SELECT id, title, summary FROM articles").fetchall()
+            if rows:
+                print(f"[Articles] Indexing {len(rows)} archived articles...")
+                self.index.add([r[0] for r in rows], [f"{title} {summary}" for _, title, summary in rows])
+                self.conn.commit()
+
+    def __len__(self):
+        return len(self.index)
+
+    def add_entries(self, feed_url, entries):
+        """Archives feed entries; returns how many were new."""
+        now = time.time()
+        ids, texts = [], []
+        with self.lock:
+            for entry in entries:
+                article_id = entry.get("id") or entry.get("link")
+                if not article_id:
+                    continue
+                title, summary = entry.get("title", ""), entry.get("summary", "")
+                inserted = self.conn.execute(
+                    "INSERT OR IGNORE INTO articles VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (article_id, feed_url, title, entry.get("link", ""), summary, entry.get("published"), now),
+                ).rowcount
+                if inserted:
+                    ids.append(article_id)
+                    texts.append(f"{title} {summary}")
+            if ids:
+                self.index.add(ids, texts)
+            self.conn.commit()
+        return len(ids)
+
+    def _rows(self, ids, since=None, until=None):
+        """{id: article dict} for the given ids, optionally within a publication window."""
+        placeholders = ",".join("?" * len(ids))
+        query = (
+            "SELECT id, title, link, COALESCE(published, first_seen) AS ts FROM articles"
+            f" WHERE id IN ({placeholders})"
+        )
+        params = list(ids)
+        if since is not None:
+            query += " AND ts >= ?"
+            params.append(since)
+        if until is not None:
+            query += " AND ts <= ?"
+            params.append(until)
+        return {
+            article_id: {"title": title, "link": link, "published": published}
+            for article_id, title, link, published in self.conn.execute(query, params).fetchall()
+        }
+
+    def search(self, query, k=10, since=None, until=None):
+        """
+        BM25-ranked articles matching the query, optionally restricted to a
+        publication window (unix timestamps). Returns dicts with title, link,
+        published and score.
+        """
+        where = None
+        if since is not None or until is not None:
+            where = lambda ids: self._rows(ids, since, until).keys()
+
+        with self.lock:
+            hits = self.index.search(query, k, where=where)
+            rows = self._rows([article_id for article_id, _ in hits]) if hits else {}
+        return [dict(rows[article_id], id=article_id, score=score) for article_id, score in hits]
+
+
+_article_store = None
+_lock = threading.Lock()
+
+
+def get_article_store():
+    """Process-wide article archive, fed by the shared feed cache."""
+    global _article_store
+    with _lock:
+        if _article_store is None:
+            from feed_cache import get_feed_cache
+            feed_cache = get_feed_cache()
+            _article_store = ArticleStore()
+            feed_cache.add_listener(_article_store.add_entries)
+            # Archive whatever the cache already fetched before the store existed
+            for url, record in list(feed_cache.feeds.items()):
+                _article_store.add_entries(url, record["entries"])
+        return _article_store
@@ -0,0 +1,172 @@
+"""
+Batch newsletter generation: runs agents.app for many topics concurrently.
+
+    python src/batch_runner.py topics.txt --concurrency 4 --llm-concurrency 2
+
+Topics are read one per line. Tool results (web, RSS, PDF retrieval) are
+shared across the topics of a batch, LLM calls are capped process-wide, and
+progress is written to <output>/batch_state.json after every topic, so
+re-running the same command after a crash skips the finished topics.
+"""
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+from contextvars import copy_context
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from langchain_core.messages import HumanMessage
+
+from config import data_path
+from resources import set_llm_concurrency
+from tools import shared_tool_results
+from tool_cache import get_tool_cache
+from tracing import span, descendants
+
+# Configuration
+BATCH_DIR = data_path("batches")
+TOPIC_CONCURRENCY = 4
+LLM_CONCURRENCY = int(os.getenv("NEWSNEXUS_LLM_CONCURRENCY", "2"))
+STATE_FILE = "batch_state.json"
+REPORT_FILE = "batch_report.json"
+
+
+def topic_key(topic):
+    """Stable file-name-safe id: slug of the topic plus a short hash."""
+    slug = re.sub(r"[^a-z0-9]+", "-", topic.lower()).strip("-")[:48]
+    return f"{slug}-{hashlib.sha1(topic.encode('utf-8')).hexdigest()[:8]}"
+
+
+def load_state(path):
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def save_state(path, state):
+    # Write-then-rename so a crash never leaves a truncated state file
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def run_topic(topic, output_dir):
+    """Runs one topic through agents.app; returns (html path, per-topic stats)."""
+    from agents import app
+
+    with span("batch_topic", kind="batch", topic=topic) as topic_span:
+        result = app.invoke({
+            "messages": [HumanMessage(content=topic)],
+            "researcher_data": [],
+            "chart_data": [],
+        })
+
+    html = result.get("draft") or result["messages"][-1].content
+    path = os.path.join(output_dir, f"{topic_key(topic)}.html")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(html)
+
+    below = descendants(topic_span)
+    llm_spans = [s for s in below if s.kind == "llm"]
+    tool_spans = [s for s in below if s.kind == "tool"]
+    seconds = topic_span.duration_ms / 1000
+    output_tokens = sum(s.attributes.get("output_tokens", 0) for s in llm_spans)
+    return path, {
+        "seconds": round(seconds, 3),
+        "llm_calls": len(llm_spans),
+        "llm_queue_ms": round(sum(s.attributes.get("queue_ms", 0) for s in llm_spans), 3),
+        "input_tokens": sum(s.attributes.get("input_tokens", 0) for s in llm_spans),
+        "output_tokens": output_tokens,
+        "output_tokens_per_s": round(output_tokens / seconds, 3) if seconds else None,
+        "tool_calls": len(tool_spans),
+        "shared_tool_hits": sum(1 for s in tool_spans if s.attributes.get("shared_hit")),
+    }
+
+
+def run_batch(topics, output_dir, concurrency=TOPIC_CONCURRENCY, llm_concurrency=LLM_CONCURRENCY):
+    """
+    Generates a newsletter per topic into output_dir and returns the batch report.
+    Topics already marked done in output_dir's state file are skipped.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    state_path = os.path.join(output_dir, STATE_FILE)
+    state = load_state(state_path)
+
+    topics = list(dict.fromkeys(t.strip() for t in topics if t.strip()))
+    pending = [t for t in topics if state.get(topic_key(t), {}).get("status") != "done"]
+    resumed = len(topics) - len(pending)
+    if resumed:
+        print(f"[Batch] Resuming: {resumed} of {len(topics)} topics already done.")
+
+    set_llm_concurrency(llm_concurrency)
+    started = time.perf_counter()
+    try:
+        with span("batch", kind="batch", topics=len(pending)), shared_tool_results() as shared, \
+                ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="topic") as pool:
+            # Each topic runs in a copy of this context: same trace, same shared tool results
+            futures = {pool.submit(copy_context().run, run_topic, t, output_dir): t for t in pending}
+            for done, future in enumerate(as_completed(futures), start=1):
+                topic = futures[future]
+                try:
+                    path, stats = future.result()
+                    state[topic_key(topic)] = {"topic": topic, "status": "done", "output": path, "stats": stats}
+                    print(f"[Batch] ({done}/{len(pending)}) {topic}: {stats['seconds']:.1f}s")
+                except Exception as e:
+                    state[topic_key(topic)] = {"topic": topic, "status": "failed", "error": str(e)}
+                    print(f"[Batch] ({done}/{len(pending)}) {topic}: FAILED ({e})")
+                save_state(state_path, state)
+    finally:
+        set_llm_concurrency(None)
+    wall = time.perf_counter() - started
+
+    tool_cache = get_tool_cache()
+    entries = [state[topic_key(t)] for t in topics if topic_key(t) in state]
+    finished = [e for e in entries if e["status"] == "done"]
+    this_run = [state[topic_key(t)] for t in pending if state.get(topic_key(t), {}).get("status") == "done"]
+    topic_seconds = sum(e["stats"]["seconds"] for e in this_run)
+    output_tokens = sum(e["stats"]["output_tokens"] for e in this_run)
+    report = {
+        "topics": len(topics),
+        "done": len(finished),
+        "failed": sum(1 for e in entries if e["status"] == "failed"),
+        "resumed": resumed,
+        "wall_seconds": round(wall, 3),
+        "topics_per_minute": round(len(this_run) / wall * 60, 3) if wall else None,
+        # Sum of per-topic latency over wall time: how many topics were effectively in flight
+        "effective_parallelism": round(topic_seconds / wall, 3) if wall else None,
+        "output_tokens_per_s": round(output_tokens / wall, 3) if wall else None,
+        "shared_tool_hits": shared.hits,
+        "shared_tool_misses": shared.misses,
+        "semantic_tool_cache": tool_cache.stats() if tool_cache else None,
+        "per_topic": {e["topic"]: e.get("stats", {"error": e.get("error")}) for e in entries},
+    }
+    with open(os.path.join(output_dir, REPORT_FILE), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("topics_file", help="text file with one topic per line")
+    parser.add_argument("--output", help="batch directory (default: data/batches/<topics file name>)")
+    parser.add_argument("--concurrency", type=int, default=TOPIC_CONCURRENCY, help="topics run at once")
+    parser.add_argument("--llm-concurrency", type=int, default=LLM_CONCURRENCY, help="LLM calls in flight at once")
+    args = parser.parse_args()
+
+    with open(args.topics_file, "r", encoding="utf-8") as f:
+        topics = f.read().splitlines()
+    output_dir = args.output or os.path.join(BATCH_DIR, os.path.splitext(os.path.basename(args.topics_file))[0])
+
+    report = run_batch(topics, output_dir, args.concurrency, args.llm_concurrency)
+    print(f"\n[Batch] {report['done']}/{report['topics']} done, {report['failed']} failed "
+          f"in {report['wall_seconds']:.1f}s ({report['topics_per_minute']} topics/min, "
+          f"{report['shared_tool_hits']} shared tool hits). Report: {os.path.join(output_dir, REPORT_FILE)}")
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+import os
+import sqlite3
+import threading
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.sqlite import SqliteSaver
+from config import data_path
+
+# Configuration (NEWSNEXUS_CHECKPOINTER=memory restores the old in-process MemorySaver)
+CHECKPOINTER_BACKEND = os.getenv("NEWSNEXUS_CHECKPOINTER", "sqlite")
+CHECKPOINT_DB_PATH = data_path("checkpoints.sqlite")
+CHECKPOINTS_PER_THREAD = 10
+
+
+class RetainingSqliteSaver(SqliteSaver):
+    """
+    SqliteSaver that keeps only the latest `keep_last` checkpoints (and their
+    pending writes) per thread, pruning right after each new checkpoint.
+    """
+
+    def __init__(self, conn, keep_last=CHECKPOINTS_PER_THREAD):
+        super().__init__(conn)
+        self.keep_last = keep_last
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+        self.prune(next_config["configurable"]["thread_id"])
+        return next_config
+
+    def prune(self, thread_id=None):
+        """Applies the retention policy to one thread, or to every thread when None."""
+        with self.cursor() as cur:
+            if thread_id is None:
+                namespaces = cur.execute("SELECT DISTINCT thread_id, checkpoint_ns FROM checkpoints").fetchall()
+            else:
+                namespaces = cur.execute(
+                    "SELECT DISTINCT thread_id, checkpoint_ns FROM checkpoints WHERE thread_id = ?", (thread_id,)
+                ).fetchall()
+
+            for thread, namespace in namespaces:
+                # checkpoint IDs are time-ordered (uuid6), so the newest sort last
+                cur.execute(
+                    "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN ("
+                    " SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+                    " ORDER BY checkpoint_id DESC LIMIT ?)",
+                    (thread, namespace, thread, namespace, self.keep_last),
+                )
+                cur.execute(
+                    "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN ("
+                    " SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?)",
+                    (thread, namespace, thread, namespace),
+                )
+
+
+_checkpointer = None
+_lock = threading.Lock()
+
+
+def get_checkpointer():
+    """
+    Shared durable checkpointer: one SQLite file in WAL mode, so paused
+    human-approval threads survive restarts of Streamlit or the CLI.
+    """
+    global _checkpointer
+    with _lock:
+        if _checkpointer is None:
+            if CHECKPOINTER_BACKEND == "memory":
+                _checkpointer = MemorySaver()
+            else:
+                os.makedirs(os.path.dirname(CHECKPOINT_DB_PATH), exist_ok=True)
+                conn = sqlite3.connect(CHECKPOINT_DB_PATH, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                _checkpointer = RetainingSqliteSaver(conn)
+        return _checkpointer
@@ -0,0 +1,11 @@
+import os
+
+# Project paths. Everything lives under one data directory, which defaults to
+# the repository's data/ folder and can be moved with NEWSNEXUS_DATA_DIR
+# (the benchmark suite points it at a scratch directory).
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DATA_DIR = os.getenv("NEWSNEXUS_DATA_DIR", os.path.join(PROJECT_ROOT, "data"))
+
+
+def data_path(*parts):
+    return os.path.join(DATA_DIR, *parts)
@@ -0,0 +1,165 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+from langchain_core.embeddings import Embeddings
+from tracing import span
+from config import data_path
+
+# Configuration
+EMBEDDING_MODEL = "nomic-embed-text"
+# "ollama" (HTTP to the Ollama server) or "onnx" (in-process onnxruntime, see onnx_embeddings.py)
+EMBEDDING_BACKEND = os.getenv("NEWSNEXUS_EMBEDDING_BACKEND", "ollama")
+CACHE_PATH = data_path("embedding_cache.sqlite")
+MAX_ENTRIES = 200_000
+
+
+class EmbeddingCache:
+    """
+    Disk-backed vector cache keyed by sha256(model + kind + text).
+    Least recently used rows are evicted once MAX_ENTRIES is exceeded.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+        self.conn.commit()
+        self.size = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def make_key(model, kind, text):
+        return hashlib.sha256(f"{model}\0{kind}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys):
+        """Returns {key: vector} for the keys present, refreshing their LRU timestamp."""
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self.lock:
+            for i in range(0, len(unique_keys), 500):
+                batch = unique_keys[i:i+500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self.conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            if found:
+                now = time.time()
+                self.conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, key) for key in found]
+                )
+                self.conn.commit()
+        return found
+
+    def put_many(self, items):
+        """Stores {key: vector} and evicts the oldest rows when over capacity."""
+        if not items:
+            return
+        now = time.time()
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, array("f", vector).tobytes(), now) for key, vector in items.items()],
+            )
+            self.size += len(items)
+            if self.size > self.max_entries:
+                self.size = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                overflow = self.size - self.max_entries
+                if overflow > 0:
+                    self.conn.execute(
+                        "DELETE FROM embeddings WHERE key IN ("
+                        " SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                        (overflow,),
+                    )
+                    self.size -= overflow
+            self.conn.commit()
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only sends cache misses to the underlying model."""
+
+    def __init__(self, embeddings, model_name, cache):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+
+    def _embed(self, texts, kind, embed_fn):
+        with span("embed", kind="embedding", model=self.model_name, texts=len(texts)) as embed_span:
+            keys = [self.cache.make_key(self.model_name, kind, text) for text in texts]
+            found = self.cache.get_many(keys)
+
+            # Embed each missing text once, even if it repeats within the batch
+            missing = {}
+            for key, text in zip(keys, texts):
+                if key not in found:
+                    missing.setdefault(key, text)
+            hits = sum(1 for key in keys if key in found)
+            self.hits += hits
+            self.misses += len(missing)
+            embed_span.set(cache_hits=hits, cache_misses=len(missing))
+
+            if missing:
+                vectors = embed_fn(list(missing.values()))
+                new_items = dict(zip(missing.keys(), vectors))
+                self.cache.put_many(new_items)
+                found.update(new_items)
+
+            return [found[key] for key in keys]
+
+    def embed_documents(self, texts):
+        return self._embed(texts, "document", self.embeddings.embed_documents)
+
+    def embed_query(self, text):
+        return self._embed([text], "query", lambda batch: [self.embeddings.embed_query(batch[0])])[0]
+
+
+_embedding_function = None
+_lock = threading.Lock()
+
+
+def get_embedding_function():
+    """
+    Process-wide cached embeddings, shared by ingestion, retrieval and memory.
+    The backend is chosen by NEWSNEXUS_EMBEDDING_BACKEND; cache keys include the
+    model name, so switching backends never mixes their vectors.
+    """
+    global _embedding_function
+    with _lock:
+        if _embedding_function is None:
+            if EMBEDDING_BACKEND == "onnx":
+                from onnx_embeddings import OnnxEmbeddings
+                backend = OnnxEmbeddings()
+                model_name = backend.model_name
+            elif EMBEDDING_BACKEND == "ollama":
+                from langchain_ollama import OllamaEmbeddings
+                backend = OllamaEmbeddings(model=EMBEDDING_MODEL)
+                model_name = EMBEDDING_MODEL
+            else:
+                raise ValueError(f"Unknown NEWSNEXUS_EMBEDDING_BACKEND: {EMBEDDING_BACKEND!r}")
+            _embedding_function = CachedEmbeddings(backend, model_name, EmbeddingCache())
+        return _embedding_function
+
+
+def embedding_model_name():
+    """Identifier of the active embedding model, recorded next to stored vectors."""
+    embeddings = get_embedding_function()
+    return getattr(embeddings, "model_name", type(embeddings).__name__)
+
+
+def set_embedding_function(embeddings):
+    """Replaces the shared embeddings, e.g. with a local stand-in for benchmarks."""
+    global _embedding_function
+    with _lock:
+        _embedding_function = embeddings
@@ -0,0 +1,133 @@
+import os
+import time
+import calendar
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Configuration (NEWSNEXUS_RSS_FEEDS overrides the list, e.g. to point at a local test server)
+FEEDS = [
+    "https://www.technologyreview.com/feed/",
+    "https://openai.com/news/rss.xml",
+    "https://techcrunch.com/feed/",
+]
+FEED_TTL = 15 * 60          # seconds before a cached feed is re-validated
+REFRESH_INTERVAL = 10 * 60  # background refresher period
+# Opt-in: NEWSNEXUS_RSS_BACKGROUND_REFRESH=1 keeps the shared cache warm from a daemon thread
+BACKGROUND_REFRESH = os.getenv("NEWSNEXUS_RSS_BACKGROUND_REFRESH", "0") == "1"
+
+
+def _entry_to_dict(entry):
+    published = entry.get("published_parsed") or entry.get("updated_parsed")
+    return {
+        "id": entry.get("id") or entry.get("link", ""),
+        "title": entry.get("title", ""),
+        "link": entry.get("link", ""),
+        "summary": entry.get("summary", ""),
+        "published": calendar.timegm(published) if published else None,
+    }
+
+
+class FeedCache:
+    """
+    In-memory cache of parsed RSS feeds.
+    Feeds are re-validated with conditional GETs (ETag / Last-Modified) once
+    their TTL expires, all stale feeds in parallel. With the background
+    refresher running, reads never touch the network.
+    """
+
+    def __init__(self, urls=None, ttl=FEED_TTL):
+        self.urls = list(urls or FEEDS)
+        self.ttl = ttl
+        self.feeds = {}  # url -> {"entries", "etag", "modified", "fetched_at"}
+        self.lock = threading.Lock()
+        self.listeners = []
+        self._stop = threading.Event()
+        self._refresher = None
+
+    def _fetch(self, url):
+        import feedparser
+
+        cached = self.feeds.get(url, {})
+        parsed = feedparser.parse(url, etag=cached.get("etag"), modified=cached.get("modified"))
+
+        if parsed.get("status") == 304:
+            entries = cached.get("entries", [])
+        elif not parsed.entries and cached.get("entries"):
+            # Network error or empty response: keep serving what we had
+            entries = cached["entries"]
+        else:
+            entries = [_entry_to_dict(entry) for entry in parsed.entries]
+            for listener in self.listeners:
+                listener(url, entries)
+
+        record = {
+            "entries": entries,
+            "etag": parsed.get("etag", cached.get("etag")),
+            "modified": parsed.get("modified", cached.get("modified")),
+            "fetched_at": time.time(),
+        }
+        with self.lock:
+            self.feeds[url] = record
+        return record
+
+    def refresh(self, force=False):
+        """Conditionally re-fetches every feed that is stale (or all, with force)."""
+        now = time.time()
+        stale = [
+            url for url in self.urls
+            if force or now - self.feeds.get(url, {}).get("fetched_at", 0) > self.ttl
+        ]
+        if stale:
+            with ThreadPoolExecutor(max_workers=len(stale)) as pool:
+                list(pool.map(self._fetch, stale))
+
+    def get_entries(self):
+        """Returns [(url, entries)] for every configured feed."""
+        if self._refresher is None:
+            self.refresh()
+        with self.lock:
+            return [(url, self.feeds.get(url, {}).get("entries", [])) for url in self.urls]
+
+    def add_listener(self, callback):
+        """callback(url, entries) runs whenever a feed returns new content."""
+        self.listeners.append(callback)
+
+    def start_background_refresh(self, interval=REFRESH_INTERVAL):
+        """Keeps the cache warm from a daemon thread."""
+        if self._refresher is not None:
+            return
+
+        def loop():
+            # The first refresh below already ran, so wait a full interval before the next
+            while not self._stop.wait(interval):
+                try:
+                    self.refresh(force=True)
+                except Exception as e:
+                    print(f"[Feeds] Background refresh failed: {e}")
+
+        self._stop.clear()
+        self.refresh()
+        self._refresher = threading.Thread(target=loop, name="feed-refresher", daemon=True)
+        self._refresher.start()
+
+    def stop_background_refresh(self):
+        if self._refresher is not None:
+            self._stop.set()
+            self._refresher.join()
+            self._refresher = None
+
+
+_feed_cache = None
+_lock = threading.Lock()
+
+
+def get_feed_cache():
+    """Process-wide feed cache for the configured FEEDS (refreshed in the background if BACKGROUND_REFRESH)."""
+    global _feed_cache
+    with _lock:
+        if _feed_cache is None:
+            urls = os.getenv("NEWSNEXUS_RSS_FEEDS")
+            _feed_cache = FeedCache(urls.split(",") if urls else FEEDS)
+            if BACKGROUND_REFRESH:
+                _feed_cache.start_background_refresh()
+        return _feed_cache
@@ -0,0 +1,253 @@
+import os
+import json
+import shutil
+import sqlite3
+import hashlib
+import time
+import threading
+from langchain_core.documents import Document
+from config import data_path
+
+# Configuration (NEWSNEXUS_VECTOR_BACKEND=flat serves library retrieval from this index)
+VECTOR_BACKEND = os.getenv("NEWSNEXUS_VECTOR_BACKEND", "chroma")
+FLAT_INDEX_PATH = data_path("flat_index")
+FLAT_DTYPE = os.getenv("NEWSNEXUS_FLAT_DTYPE", "float16")   # "float16" or "int8"
+
+# Each build goes to its own version directory under FLAT_INDEX_PATH; CURRENT names the live one.
+# Nothing open is ever renamed or replaced, which Windows refuses while files are mapped.
+CURRENT_FILE = "CURRENT"
+VECTORS_FILE = "vectors.npy"
+META_FILE = "meta.sqlite"
+INT8_SCALE = 127.0
+# Rows scored per block; keeps the float32 working copy of the memmap small
+SCAN_BLOCK = 4096
+EXPORT_PAGE = 1000
+
+
+def content_digest(chunk_ids, model_name):
+    """Identifies what an index was built from: the chunk id set plus the embedding model."""
+    digest = hashlib.sha256(model_name.encode("utf-8"))
+    for chunk_id in sorted(chunk_ids):
+        digest.update(b"\0" + chunk_id.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def current_version(path=FLAT_INDEX_PATH):
+    """Directory of the live index version under `path`, or None if there is none."""
+    try:
+        with open(os.path.join(path, CURRENT_FILE), "r", encoding="utf-8") as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return os.path.join(path, version) if version else None
+
+
+def remove_old_versions(path, keep=None):
+    """
+    Deletes everything under `path` except CURRENT and the `keep` version.
+    Versions still mapped by a reader fail to delete on Windows; the next build retries.
+    """
+    if not os.path.isdir(path):
+        return
+    for name in os.listdir(path):
+        if name in (CURRENT_FILE, keep):
+            continue
+        target = os.path.join(path, name)
+        if os.path.isdir(target):
+            shutil.rmtree(target, ignore_errors=True)
+        else:
+            try:
+                os.remove(target)
+            except OSError:
+                pass
+
+
+class FlatVectorIndex:
+    """
+    Brute-force vector index over a read-only NumPy memmap of normalised
+    float16 (or int8) vectors, with ids, texts and metadata in a SQLite
+    sidecar whose row numbers match the matrix rows.
+    Distances are squared L2 between unit vectors (2 - 2*cosine), the same
+    scale Chroma reports, so thresholds carry over.
+    """
+
+    def __init__(self, path=FLAT_INDEX_PATH, embeddings=None):
+        import numpy as np
+
+        self.path = path
+        self.directory = current_version(path)
+        if self.directory is None:
+            raise FileNotFoundError(f"No flat vector index at {path}")
+        self.embeddings = embeddings
+        # mmap_mode="r": nothing is read until a query touches the pages
+        self.conn = sqlite3.connect(os.path.join(self.directory, META_FILE), check_same_thread=False)
+        self.lock = threading.Lock()
+        self.info = dict(self.conn.execute("SELECT key, value FROM info").fetchall())
+        self.vectors = np.load(os.path.join(self.directory, VECTORS_FILE), mmap_mode="r")[:int(self.info["rows"])]
+        self.scale = INT8_SCALE if self.vectors.dtype == np.int8 else 1.0
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    @staticmethod
+    def exists(path=FLAT_INDEX_PATH):
+        directory = current_version(path)
+        return directory is not None and os.path.exists(os.path.join(directory, META_FILE))
+
+    @classmethod
+    def build(cls, path, rows, count, dim, info, dtype=FLAT_DTYPE):
+        """
+        Writes an index from (id, embedding, document, metadata) rows into a new
+        version directory and points CURRENT at it. Open readers keep mapping
+        the old version, which is deleted once nothing holds it.
+        """
+        import numpy as np
+
+        version = f"v{time.time_ns()}"
+        version_path = os.path.join(path, version)
+        os.makedirs(version_path)
+        vectors = np.lib.format.open_memmap(
+            os.path.join(version_path, VECTORS_FILE), mode="w+", dtype=np.dtype(dtype), shape=(count, dim)
+        )
+        conn = sqlite3.connect(os.path.join(version_path, META_FILE))
+        conn.execute("CREATE TABLE chunks (row INTEGER PRIMARY KEY, id TEXT UNIQUE, document TEXT, metadata TEXT)")
+        conn.execute("CREATE TABLE info (key TEXT PRIMARY KEY, value TEXT)")
+
+        row = 0
+        for chunk_id, embedding, document, metadata in rows:
+            vector = np.asarray(embedding, dtype=np.float32)
+            vector /= np.linalg.norm(vector) + 1e-12
+            vectors[row] = np.round(vector * INT8_SCALE) if dtype == "int8" else vector
+            conn.execute(
+                "INSERT INTO chunks VALUES (?, ?, ?, ?)", (row, chunk_id, document, json.dumps(metadata or {}))
+            )
+            row += 1
+        vectors.flush()
+        del vectors
+        conn.executemany("INSERT INTO info VALUES (?, ?)", [(k, str(v)) for k, v in dict(info, rows=row).items()])
+        conn.commit()
+        conn.close()
+
+        # CURRENT is only read briefly when an index is opened, so replacing it is safe everywhere
+        tmp_pointer = os.path.join(path, CURRENT_FILE + ".tmp")
+        with open(tmp_pointer, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(tmp_pointer, os.path.join(path, CURRENT_FILE))
+        remove_old_versions(path, keep=version)
+
+    def _row_ids(self, where):
+        """Rows whose metadata matches an equality filter like {"source": "x.pdf"}."""
+        clauses, params = [], []
+        for key, value in where.items():
+            if isinstance(value, dict):
+                raise ValueError("FlatVectorIndex filters support equality matches only")
+            clauses.append("json_extract(metadata, ?) = ?")
+            params += [f"$.{key}", value]
+        query = "SELECT row FROM chunks WHERE " + " AND ".join(clauses)
+        with self.lock:
+            return [r for (r,) in self.conn.execute(query, params).fetchall()]
+
+    def search_by_vector(self, vector, k, where=None):
+        """Top-k rows for a query vector: list of (row, squared L2 distance), closest first."""
+        import numpy as np
+
+        if len(self) == 0:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        query /= np.linalg.norm(query) + 1e-12
+        rows = np.asarray(self._row_ids(where), dtype=np.int64) if where else None
+
+        if rows is None:
+            similarity = np.empty(len(self), dtype=np.float32)
+            for start in range(0, len(self), SCAN_BLOCK):
+                block = self.vectors[start:start + SCAN_BLOCK]
+                similarity[start:start + len(block)] = block.astype(np.float32) @ query
+            candidates = np.arange(len(self))
+        else:
+            similarity = self.vectors[rows].astype(np.float32) @ query if len(rows) else np.empty(0, np.float32)
+            candidates = rows
+        similarity /= self.scale
+
+        k = min(k, len(similarity))
+        if k == 0:
+            return []
+        top = np.argpartition(-similarity, k - 1)[:k]
+        top = top[np.argsort(-similarity[top])]
+        return [(int(candidates[i]), float(2.0 - 2.0 * similarity[i])) for i in top]
+
+    def rows(self, rows):
+        """{row: (id, Document)} for the given rows."""
+        found = {}
+        for i in range(0, len(rows), 500):
+            batch = rows[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            with self.lock:
+                fetched = self.conn.execute(
+                    f"SELECT row, id, document, metadata FROM chunks WHERE row IN ({placeholders})", batch
+                ).fetchall()
+            for row, chunk_id, document, metadata in fetched:
+                found[row] = (chunk_id, Document(page_content=document, metadata=json.loads(metadata)))
+        return found
+
+    def vector(self, row):
+        import numpy as np
+
+        return self.vectors[row].astype(np.float32) / self.scale
+
+    def get_chunks(self, ids):
+        """{id: (Document, stored (normalised) vector)} for the ids present."""
+        found = {}
+        for i in range(0, len(ids), 500):
+            batch = ids[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            with self.lock:
+                fetched = self.conn.execute(
+                    f"SELECT id, row, document, metadata FROM chunks WHERE id IN ({placeholders})", batch
+                ).fetchall()
+            for chunk_id, row, document, metadata in fetched:
+                found[chunk_id] = (Document(page_content=document, metadata=json.loads(metadata)), self.vector(row))
+        return found
+
+    def similarity_search_with_score(self, query, k=4, filter=None):
+        """Same contract as Chroma's: (Document, distance) pairs, closest first."""
+        hits = self.search_by_vector(self.embeddings.embed_query(query), k, filter)
+        docs = self.rows([row for row, _ in hits])
+        return [(docs[row][1], distance) for row, distance in hits]
+
+
+def export_from_chroma(vector_db, chunk_ids, model_name, path=FLAT_INDEX_PATH, dtype=FLAT_DTYPE):
+    """
+    Rebuilds the flat index from a Chroma collection unless it already holds
+    exactly `chunk_ids` embedded with `model_name`. Returns True if rebuilt.
+    """
+    digest = content_digest(chunk_ids, model_name)
+    if FlatVectorIndex.exists(path):
+        current = FlatVectorIndex(path)
+        unchanged = current.info.get("digest") == digest and current.vectors.dtype.name == dtype
+        current.conn.close()
+        del current  # unmaps the version so it can be deleted after a rebuild
+        if unchanged:
+            return False
+
+    collection = vector_db._collection
+    count = collection.count()
+    if count == 0:
+        # Empty library: drop the index so retrieval falls back to the (empty) collection
+        existed = FlatVectorIndex.exists(path)
+        if existed:
+            os.remove(os.path.join(path, CURRENT_FILE))
+        remove_old_versions(path)
+        return existed
+    first = collection.get(limit=1, include=["embeddings"])
+    dim = len(first["embeddings"][0])
+
+    def rows():
+        for offset in range(0, count, EXPORT_PAGE):
+            page = collection.get(
+                limit=EXPORT_PAGE, offset=offset, include=["embeddings", "documents", "metadatas"]
+            )
+            yield from zip(page["ids"], page["embeddings"], page["documents"], page["metadatas"])
+
+    print(f"Building flat {dtype} vector index ({count} vectors)...")
+    FlatVectorIndex.build(path, rows(), count, dim, {"digest": digest, "model": model_name}, dtype)
+    return True
@@ -1,43 +1,442 @@
 import os
-from langchain_community.document_loaders import PyPDFDirectoryLoader
+import json
+import time
+import queue
+import hashlib
+import threading
+from pathlib import Path
+from collections import deque
+from contextvars import copy_context
+from concurrent.futures import ProcessPoolExecutor
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
+from lexical_index import BM25_PATH, BM25Index
+from resources import get_embeddings, get_vector_store, refresh_vector_stores, refresh_lexical_index, refresh_flat_index
+from flat_index import VECTOR_BACKEND, export_from_chroma
+from config import data_path
+from embedding_cache import EMBEDDING_MODEL, embedding_model_name
+from tool_cache import invalidate_tool_results
+from tracing import span
+
+DATA_PATH = data_path("raw_pdfs")
+DB_PATH = data_path("chroma_db")
+
+# Manifest of what is already embedded: {relative pdf path: {sha256, pages, chunk_ids}}
+MANIFEST_PATH = os.path.join(DB_PATH, "ingest_manifest.json")
+BATCH_SIZE = 100
+
+# Parsing runs in a process pool; large PDFs are split into page ranges
+PARSE_WORKERS = int(os.getenv("NEWSNEXUS_PARSE_WORKERS", "0")) or os.cpu_count() or 1
+PAGES_PER_TASK = 25
+
+# Bounded queue depth (in batches) between the parse/split/embed/upsert stages
+QUEUE_SIZE = 4
+
+
+def file_sha256(path):
+    """Content hash of a PDF, read in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest():
+    if not os.path.exists(MANIFEST_PATH):
+        return None
+    with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest):
+    # Write to a temp file first so a crash never leaves a half-written manifest
+    os.makedirs(os.path.dirname(MANIFEST_PATH), exist_ok=True)
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+# Bumped whenever chunk_id() changes; older manifests are rebuilt from scratch
+CHUNK_ID_VERSION = 2
+
+
+def chunk_id(name, file_hash, page, index):
+    """
+    Deterministic chunk ID, so re-ingesting the same file upserts instead of duplicating.
+    The file name is part of it: byte-identical copies of a PDF get their own chunks.
+    """
+    name_hash = hashlib.sha256(name.encode("utf-8")).hexdigest()[:8]
+    return f"{name_hash}-{file_hash[:16]}-p{page}-c{index}"
+
+
+def _document_metadata(reader, path):
+    """
+    File-level metadata exactly as langchain's PyPDFParser builds it: the PDF
+    info dictionary with keys lowercased and stripped of '/', PDF dates as
+    ISO 8601, plus source and total_pages.
+    """
+    from datetime import datetime
+
+    raw = {"producer": "PyPDF", "creator": "PyPDF", "creationdate": ""}
+    raw.update(reader.metadata or {})
+    raw.update({"source": path, "total_pages": len(reader.pages)})
+
+    metadata = {}
+    for key, value in raw.items():
+        if type(value) not in (str, int):
+            value = str(value)
+        key = key[1:] if key.startswith("/") else key
+        key = key.lower()
+        if key in ("creationdate", "moddate"):
+            try:
+                value = datetime.strptime(value.replace("'", ""), "D:%Y%m%d%H%M%S%z").isoformat("T")
+            except ValueError:
+                pass
+        metadata[key] = value
+        if key == "page_count":
+            metadata["total_pages"] = value
+        elif key == "file_path":
+            metadata["source"] = value
+    return metadata
+
+
+def _parse_page_range(path, start, end):
+    """Worker: extract pages [start, end) of one PDF exactly as PyPDFLoader would."""
+    from pypdf import PdfReader
+    from langchain_core.documents import Document
+
+    reader = PdfReader(path)
+    metadata = _document_metadata(reader, path)
+    labels = reader.page_labels
+    return [
+        Document(
+            page_content=reader.pages[page].extract_text().strip(),
+            metadata=dict(metadata, page=page, page_label=labels[page]),
+        )
+        for page in range(start, end)
+    ]
+
+
+def iter_parsed_pages(paths, workers=None):
+    """
+    Parse PDFs across a process pool, yielding (path, pages, is_last_range)
+    in file order, then page order. At most two page ranges per worker are
+    in flight, so memory does not grow with the size of the library.
+    """
+    from pypdf import PdfReader
+
+    workers = workers or PARSE_WORKERS
+
+    def page_ranges():
+        for path in paths:
+            page_count = len(PdfReader(path).pages)
+            if page_count == 0:
+                yield path, 0, 0, True
+            for start in range(0, page_count, PAGES_PER_TASK):
+                end = min(start + PAGES_PER_TASK, page_count)
+                yield path, start, end, end == page_count
+
+    if workers <= 1:
+        for path, start, end, is_last in page_ranges():
+            yield path, _parse_page_range(path, start, end), is_last
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for path, start, end, is_last in page_ranges():
+            pending.append((path, pool.submit(_parse_page_range, path, start, end), is_last))
+            if len(pending) >= workers * 2:
+                path, future, is_last = pending.popleft()
+                yield path, future.result(), is_last
+        while pending:
+            path, future, is_last = pending.popleft()
+            yield path, future.result(), is_last
+
+
+def parse_pdfs(paths, workers=None):
+    """
+    Parse PDFs into one Document per page across a process pool, with the
+    same text and metadata as PyPDFDirectoryLoader.
+    """
+    return [page for _, pages, _ in iter_parsed_pages(paths, workers) for page in pages]
+
+
+# ----------------------------
+# Streaming pipeline
+# ----------------------------
+_DONE = object()
+
+
+class StageStats:
+    """Items handled and busy time of one pipeline stage."""
+
+    def __init__(self, name, unit):
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.busy = 0.0
+
+    def report(self):
+        rate = self.items / self.busy if self.busy else 0.0
+        return f"{self.name:<7} {self.items:>7} {self.unit:<6} in {self.busy:7.2f}s busy ({rate:,.1f} {self.unit}/s)"
+
+
+def _run_stage(handler, inbox, outbox, stats, errors):
+    """
+    Pull messages from `inbox`, push whatever `handler` yields to `outbox`.
+    After an error anywhere in the pipeline the stage only drains its inbox,
+    so upstream stages never block on a full queue.
+    """
+    while True:
+        message = inbox.get()
+        if message is _DONE:
+            break
+        if errors:
+            continue
+        try:
+            started = time.perf_counter()
+            results = list(handler(message))
+            stats.busy += time.perf_counter() - started
+        except Exception as e:
+            errors.append(e)
+            continue
+        for result in results:
+            outbox.put(result)
+    if outbox is not None:
+        outbox.put(_DONE)
+
+
+def list_pdfs():
+    """
+    {relative path: path} of the PDFs PyPDFDirectoryLoader would load, in the
+    order it loads them (its default glob, hidden files and folders skipped).
+    """
+    pdfs = {}
+    if not os.path.isdir(DATA_PATH):
+        return pdfs
+    root = Path(DATA_PATH)
+    for path in root.glob("**/[!.]*.pdf"):
+        relative = path.relative_to(root)
+        if path.is_file() and not any(part.startswith(".") for part in relative.parts):
+            pdfs[relative.as_posix()] = str(path)
+    return pdfs
+
+
+def delete_chunks(vector_db, ids):
+    for i in range(0, len(ids), BATCH_SIZE):
+        vector_db.delete(ids=ids[i:i+BATCH_SIZE])
 
-DATA_PATH = r"D:\Python-Project\news-nexus\data\raw_pdfs"
-DB_PATH = r"D:\Python-Project\news-nexus\data\chroma_db"
 
 def ingest_documents():
-    print(f"loading documents from {DATA_PATH}...")
-    loader = PyPDFDirectoryLoader(DATA_PATH)
-    raw_documents = loader.load()
-    print(f"loaded {len(raw_documents)} pages.")
+    with span("ingest_documents", kind="ingestion") as ingest_span:
+        pages, chunks = _ingest_documents()
+        if VECTOR_BACKEND == "flat":
+            sync_flat_index()
+        ingest_span.set(pages=pages, chunks=chunks)
+        return pages, chunks
+
+
+def sync_flat_index():
+    """Re-exports the Chroma collection to the memory-mapped flat index when its contents changed."""
+    manifest = load_manifest() or {"files": {}}
+    chunk_ids = [chunk for entry in manifest["files"].values() for chunk in entry["chunk_ids"]]
+    if export_from_chroma(get_vector_store(DB_PATH), chunk_ids, embedding_model_name()):
+        refresh_flat_index()
+
+
+def _ingest_documents():
+    print(f"scanning documents in {DATA_PATH}...")
+    pdfs = list_pdfs()
+    current_hashes = {name: file_sha256(path) for name, path in pdfs.items()}
+
+    embedding_model = get_embeddings()
+    vector_db = get_vector_store(DB_PATH)
+
+    # The BM25 index is built alongside the Chroma collection and kept in sync with the manifest
+    lexical_index = BM25Index(BM25_PATH)
+
+    model_name = embedding_model_name()
+    manifest = load_manifest()
+    # Vectors of another embedding model (e.g. after switching to the ONNX backend)
+    # are not comparable with new query embeddings, so that index is rebuilt too.
+    # Manifests written before the model was recorded used the Ollama default.
+    if manifest is not None and manifest.get("embedding_model", EMBEDDING_MODEL) != model_name:
+        print(f"Embedding model changed to {model_name}, re-embedding the library...")
+        manifest = None
+    # Chunk IDs of an older scheme may be shared between identical files
+    if manifest is not None and manifest.get("chunk_id_version", 1) != CHUNK_ID_VERSION:
+        print("Chunk ID scheme changed, re-indexing the library...")
+        manifest = None
+    if manifest is None:
+        # Index built before the manifest existed: its vectors have random IDs we
+        # cannot track, so start from a clean collection once.
+        if vector_db._collection.count() > 0:
+            print("No usable ingestion manifest found, rebuilding the vector store from scratch...")
+            vector_db.delete_collection()
+            refresh_vector_stores(DB_PATH)
+            vector_db = get_vector_store(DB_PATH)
+        manifest = {"files": {}}
+        lexical_index.clear()
+    manifest["embedding_model"] = model_name
+    manifest["chunk_id_version"] = CHUNK_ID_VERSION
+    files = manifest["files"]
+
+    # Files whose chunks never made it into the BM25 index (e.g. an interrupted
+    # run) are re-ingested; their deterministic IDs make the vector upsert idempotent.
+    for name in list(files):
+        if lexical_index.missing(files[name]["chunk_ids"]):
+            delete_chunks(vector_db, files[name]["chunk_ids"])
+            lexical_index.remove(files[name]["chunk_ids"])
+            del files[name]
+
+    removed = [name for name in files if name not in current_hashes]
+    changed = [name for name, sha in current_hashes.items() if files.get(name, {}).get("sha256") != sha]
+
+    if not removed and not changed:
+        print("Vector store is up to date, nothing to ingest.")
+        return 0, 0
+
+    # Drop vectors of deleted files and of files whose content was replaced
+    for name in removed + changed:
+        if name in files:
+            delete_chunks(vector_db, files[name]["chunk_ids"])
+            lexical_index.remove(files[name]["chunk_ids"])
+            print(f">removed {len(files[name]['chunk_ids'])} stale chunks of {name}")
+            del files[name]
+    save_manifest(manifest)
+    if not changed:
+        lexical_index.save()
+        refresh_vector_stores(DB_PATH)
+        refresh_lexical_index()
+        invalidate_tool_results("lookup_policy_docs")
+        print(f"Vector store updated sucessfully (0 new/changed, {len(removed)} removed files).")
+        return 0, 0
 
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=500,
         chunk_overlap=50,
         length_function=len,
         is_separator_regex=False)
-    
-    chunks = text_splitter.split_documents(raw_documents)
-    print(f"split into {len(chunks)} chunks.")
-
-    from langchain_ollama import OllamaEmbeddings
-    embedding_model = OllamaEmbeddings(model="nomic-embed-text")
-    print("Initializing vector store(this may take a few minutes for large PDFs)...")
-    vector_db = Chroma(persist_directory=DB_PATH, embedding_function=embedding_model)
-    BATCH_SIZE = 100
-    total_chunks = len(chunks)
-    for i in range(0, total_chunks, BATCH_SIZE):
-        batch = chunks[i:i+BATCH_SIZE]
-        vector_db.add_documents(batch)
-        print(f">processsing batch {i//BATCH_SIZE + 1} of {total_chunks//BATCH_SIZE + 1}({len(batch)}chunks)...")
-    
-    print("Vector store created sucessfully.")
-    return len(raw_documents), len(chunks)
+
+    split_queue, embed_queue, upsert_queue = (queue.Queue(maxsize=QUEUE_SIZE) for _ in range(3))
+    stats = {
+        "parse": StageStats("parse", "pages"),
+        "split": StageStats("split", "chunks"),
+        "embed": StageStats("embed", "chunks"),
+        "upsert": StageStats("upsert", "chunks"),
+    }
+    errors = []
+    names = {pdfs[name]: name for name in changed}
+
+    # Stage 1 (split): pages -> batches of chunks with deterministic IDs
+    pending_chunks = {}
+
+    def split(message):
+        kind, name = message[0], message[1]
+        buffer = pending_chunks.setdefault(name, ([], []))
+        if kind == "pages":
+            for page in message[2]:
+                page_number = page.metadata.get("page", 0)
+                for index, chunk in enumerate(text_splitter.split_documents([page])):
+                    buffer[0].append(chunk)
+                    buffer[1].append(chunk_id(name, current_hashes[name], page_number, index))
+        while len(buffer[0]) >= BATCH_SIZE or (kind == "end" and buffer[0]):
+            batch, ids = buffer[0][:BATCH_SIZE], buffer[1][:BATCH_SIZE]
+            del buffer[0][:BATCH_SIZE], buffer[1][:BATCH_SIZE]
+            stats["split"].items += len(batch)
+            yield ("chunks", name, batch, ids)
+        if kind == "end":
+            del pending_chunks[name]
+            yield message
+
+    # Stage 2 (embed): chunk batches -> vectors
+    def embed(message):
+        if message[0] == "chunks":
+            _, name, batch, ids = message
+            vectors = embedding_model.embed_documents([chunk.page_content for chunk in batch])
+            stats["embed"].items += len(batch)
+            message = ("vectors", name, batch, ids, vectors)
+        yield message
+
+    # Stage 3 (upsert): vectors -> Chroma, then record finished files in the manifest
+    written_ids = {}
+    totals = {"pages": 0, "chunks": 0}
+
+    def upsert(message):
+        if message[0] == "vectors":
+            _, name, batch, ids, vectors = message
+            vector_db._collection.upsert(
+                ids=ids,
+                embeddings=vectors,
+                documents=[chunk.page_content for chunk in batch],
+                metadatas=[chunk.metadata for chunk in batch],
+            )
+            lexical_index.add(ids, [chunk.page_content for chunk in batch])
+            written_ids.setdefault(name, []).extend(ids)
+            stats["upsert"].items += len(batch)
+        else:
+            # Record each file as soon as it is done so an interrupted run resumes here
+            _, name, page_count = message
+            ids = written_ids.pop(name, [])
+            files[name] = {"sha256": current_hashes[name], "pages": page_count, "chunk_ids": ids}
+            lexical_index.save()
+            save_manifest(manifest)
+            totals["pages"] += page_count
+            totals["chunks"] += len(ids)
+            print(f">embedded {name}: {page_count} pages, {len(ids)} chunks")
+        return ()
+
+    # Stage threads run in copies of this context so their embedding spans join the ingestion trace
+    workers = [
+        threading.Thread(target=copy_context().run, args=(_run_stage, split, split_queue, embed_queue, stats["split"], errors)),
+        threading.Thread(target=copy_context().run, args=(_run_stage, embed, embed_queue, upsert_queue, stats["embed"], errors)),
+        threading.Thread(target=copy_context().run, args=(_run_stage, upsert, upsert_queue, None, stats["upsert"], errors)),
+    ]
+    for worker in workers:
+        worker.start()
+
+    # Stage 0 (parse) runs on this thread and feeds the pipeline
+    print(f"Updating vector store with {len(changed)} PDFs ({PARSE_WORKERS} parse workers)...")
+    pages_seen = {}
+    try:
+        parsed = iter_parsed_pages([pdfs[name] for name in changed])
+        while not errors:
+            started = time.perf_counter()
+            item = next(parsed, None)
+            stats["parse"].busy += time.perf_counter() - started
+            if item is None:
+                break
+            path, pages, is_last = item
+            name = names[path]
+            stats["parse"].items += len(pages)
+            pages_seen[name] = pages_seen.get(name, 0) + len(pages)
+            split_queue.put(("pages", name, pages))
+            if is_last:
+                split_queue.put(("end", name, pages_seen.pop(name)))
+    except Exception as e:
+        errors.append(e)
+    finally:
+        split_queue.put(_DONE)
+        for worker in workers:
+            worker.join()
+
+    for stage in stats.values():
+        print(f"  {stage.report()}")
+    # Make retrieval and the UI pick up the rebuilt collection and BM25 index
+    lexical_index.save()
+    refresh_vector_stores(DB_PATH)
+    refresh_lexical_index()
+    invalidate_tool_results("lookup_policy_docs")
+    if errors:
+        raise errors[0]
+
+    print(f"Vector store updated sucessfully ({len(changed)} new/changed, {len(removed)} removed files).")
+    return totals["pages"], totals["chunks"]
 if __name__ == "__main__":
     os.makedirs(DB_PATH, exist_ok=True)
-    
+
     if not os.path.exists(DATA_PATH) or not os.listdir(DATA_PATH):
         print(f"No PDF's found in {DATA_PATH} Please add files to RAG")
     else:
-        ingest_documents()
\ No newline at end of file
+        ingest_documents()
@@ -0,0 +1,236 @@
+import os
+import re
+import json
+import math
+import sqlite3
+import threading
+from collections import Counter, OrderedDict
+from config import data_path
+
+# Configuration (persisted next to chroma_db)
+BM25_PATH = data_path("bm25_index.sqlite")
+# Terms whose postings are kept in memory as NumPy arrays between queries
+POSTINGS_CACHE_TERMS = 4096
+# Ids per SQLite IN (...) lookup
+ID_BATCH = 500
+
+TOKEN_PATTERN = re.compile(r"\w+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "in", "is",
+    "it", "its", "of", "on", "or", "that", "the", "this", "to", "was", "were", "will", "with",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bm25_docs (doc INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, length INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS bm25_postings (
+    term TEXT NOT NULL, doc INTEGER NOT NULL, tf INTEGER NOT NULL, length INTEGER NOT NULL,
+    PRIMARY KEY (term, doc)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS bm25_postings_doc ON bm25_postings (doc);
+CREATE TABLE IF NOT EXISTS bm25_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO bm25_meta VALUES ('docs', 0), ('total_length', 0), ('generation', 0);
+"""
+
+
+def tokenize(text):
+    """Lowercased word tokens; numbers and codes like 'basel3' are kept as-is."""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Inverted index with Okapi BM25 ranking, stored in SQLite.
+    Only ids, document lengths and per-term frequencies are kept (the texts
+    live in Chroma or the article table), and add/remove touch just the rows
+    of the documents involved. A query reads each of its terms' postings once
+    into NumPy arrays of per-document BM25 impacts (LRU-cached until the index
+    changes), so even common terms cost a few array operations rather than a
+    Python loop over every posting.
+    """
+
+    def __init__(self, path=BM25_PATH, conn=None, k1=1.5, b=0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        if conn is None:
+            if path:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            conn = sqlite3.connect(path or ":memory:", check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+        self.conn = conn
+        self.lock = threading.RLock()
+        self.conn.executescript(SCHEMA)
+        self._postings = OrderedDict()  # term -> (doc rows, BM25 impacts) arrays
+        self._generation = None
+        if path and len(self) == 0:
+            self._import_json()
+
+    def _import_json(self):
+        """One-off import of the older format: a JSON file holding every chunk text."""
+        legacy_path = os.path.splitext(self.path)[0] + ".json"
+        if not os.path.exists(legacy_path):
+            return
+        with open(legacy_path, "r", encoding="utf-8") as f:
+            docs = json.load(f)["docs"]
+        self.add(list(docs), [text for text, _ in docs.values()])
+        self.save()
+        os.remove(legacy_path)
+
+    def save(self):
+        """Commits pending adds and removes."""
+        with self.lock:
+            self.conn.commit()
+
+    def _meta(self):
+        return dict(self.conn.execute("SELECT key, value FROM bm25_meta").fetchall())
+
+    def _changed(self, docs, length):
+        # Impacts depend on the document count and average length, so any change drops
+        # the cached postings; other connections notice the new generation once committed
+        self.conn.execute("UPDATE bm25_meta SET value = value + ? WHERE key = 'docs'", (docs,))
+        self.conn.execute("UPDATE bm25_meta SET value = value + ? WHERE key = 'total_length'", (length,))
+        self.conn.execute("UPDATE bm25_meta SET value = value + 1 WHERE key = 'generation'")
+        self._postings.clear()
+
+    def __len__(self):
+        with self.lock:
+            return self._meta()["docs"]
+
+    def __contains__(self, doc_id):
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM bm25_docs WHERE id = ?", (doc_id,)).fetchone() is not None
+
+    def missing(self, ids):
+        """The ids that are not in the index, in order."""
+        found = set()
+        with self.lock:
+            for i in range(0, len(ids), ID_BATCH):
+                batch = ids[i:i + ID_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                found.update(r for (r,) in self.conn.execute(
+                    f"SELECT id FROM bm25_docs WHERE id IN ({placeholders})", batch
+                ).fetchall())
+        return [doc_id for doc_id in ids if doc_id not in found]
+
+    def add(self, ids, texts):
+        with self.lock:
+            self.remove(ids)
+            total_length = 0
+            for doc_id, text in zip(ids, texts):
+                counts = Counter(tokenize(text))
+                length = sum(counts.values())
+                doc = self.conn.execute("INSERT INTO bm25_docs (id, length) VALUES (?, ?)", (doc_id, length)).lastrowid
+                self.conn.executemany(
+                    "INSERT INTO bm25_postings VALUES (?, ?, ?, ?)",
+                    [(term, doc, tf, length) for term, tf in counts.items()],
+                )
+                total_length += length
+            self._changed(len(ids), total_length)
+
+    def remove(self, ids):
+        with self.lock:
+            removed, total_length = 0, 0
+            for i in range(0, len(ids), ID_BATCH):
+                batch = ids[i:i + ID_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self.conn.execute(
+                    f"SELECT doc, length FROM bm25_docs WHERE id IN ({placeholders})", batch
+                ).fetchall()
+                for doc, length in rows:
+                    self.conn.execute("DELETE FROM bm25_postings WHERE doc = ?", (doc,))
+                    self.conn.execute("DELETE FROM bm25_docs WHERE doc = ?", (doc,))
+                    removed += 1
+                    total_length += length
+            if removed:
+                self._changed(-removed, -total_length)
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM bm25_postings")
+            self.conn.execute("DELETE FROM bm25_docs")
+            self.conn.execute("UPDATE bm25_meta SET value = 0 WHERE key IN ('docs', 'total_length')")
+            self._changed(0, 0)
+
+    def _term_postings(self, term, n_docs, avg_length):
+        """(doc rows, BM25 contribution of `term` to each) for the current collection statistics."""
+        import numpy as np
+
+        postings = self._postings.get(term)
+        if postings is None:
+            rows = self.conn.execute("SELECT doc, tf, length FROM bm25_postings WHERE term = ?", (term,)).fetchall()
+            rows = np.asarray(rows, dtype=np.int64).reshape(-1, 3)
+            tf = rows[:, 1].astype(np.float64)
+            idf = math.log(1 + (n_docs - len(rows) + 0.5) / (len(rows) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * rows[:, 2] / avg_length)
+            postings = (rows[:, 0], idf * tf * (self.k1 + 1) / (tf + norm))
+            self._postings[term] = postings
+            if len(self._postings) > POSTINGS_CACHE_TERMS:
+                self._postings.popitem(last=False)
+        else:
+            self._postings.move_to_end(term)
+        return postings
+
+    def _ids(self, docs):
+        placeholders = ",".join("?" * len(docs))
+        return dict(self.conn.execute(
+            f"SELECT doc, id FROM bm25_docs WHERE doc IN ({placeholders})", [int(d) for d in docs]
+        ).fetchall())
+
+    def search(self, query, k=10, where=None):
+        """
+        Returns the top-k (id, bm25 score) pairs for the query terms.
+        `where(ids) -> allowed ids` optionally restricts which documents may
+        match; it is called with batches of candidate ids, best first.
+        """
+        import numpy as np
+
+        terms = set(tokenize(query))
+        if k <= 0:
+            return []
+        with self.lock:
+            meta = self._meta()
+            if meta["generation"] != self._generation:
+                self._postings.clear()
+                self._generation = meta["generation"]
+            n_docs = meta["docs"]
+            if not terms or not n_docs:
+                return []
+            avg_length = meta["total_length"] / n_docs
+
+            postings = [self._term_postings(term, n_docs, avg_length) for term in terms]
+            postings = [(docs, impacts) for docs, impacts in postings if len(docs)]
+            if not postings:
+                return []
+            if len(postings) == 1:
+                candidates, scores = postings[0]
+            else:
+                # Sum per document: doc rows are small integers, so a dense bincount beats sorting;
+                # rows without a match score 0 and are dropped below
+                scores = np.bincount(
+                    np.concatenate([docs for docs, _ in postings]),
+                    weights=np.concatenate([impacts for _, impacts in postings]),
+                )
+                candidates = np.arange(len(scores))
+
+            if where is None:
+                top = np.argpartition(-scores, k - 1)[:k] if len(scores) > k else np.arange(len(scores))
+                top = top[scores[top] > 0]
+                top = top[np.argsort(-scores[top], kind="stable")]
+                if not len(top):
+                    return []
+                ids = self._ids(candidates[top])
+                return [(ids[candidates[i]], float(scores[i])) for i in top]
+
+            results = []
+            order = np.flatnonzero(scores > 0)
+            order = order[np.argsort(-scores[order], kind="stable")]
+            for start in range(0, len(order), ID_BATCH):
+                batch = order[start:start + ID_BATCH]
+                ids = self._ids(candidates[batch])
+                allowed = where([ids[candidates[i]] for i in batch])
+                for i in batch:
+                    if ids[candidates[i]] in allowed:
+                        results.append((ids[candidates[i]], float(scores[i])))
+                        if len(results) == k:
+                            return results
+            return results
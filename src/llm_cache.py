@@ -0,0 +1,104 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from tracing import current_span
+from config import data_path
+
+# Configuration (opt-in: set NEWSNEXUS_LLM_CACHE=1)
+LLM_CACHE_ENABLED = os.getenv("NEWSNEXUS_LLM_CACHE", "0") == "1"
+LLM_CACHE_PATH = data_path("llm_cache.sqlite")
+LLM_CACHE_MAX_ENTRIES = 5000
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+    Deterministic response cache for chat models.
+    LangChain passes the serialized message list as `prompt` and the model name,
+    parameters and bound tools as `llm_string`; both are hashed into the key.
+    Generations (including tool-call payloads) are stored with langchain's
+    serializer and the least recently used rows are evicted past max_entries.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_responses ("
+            " key TEXT PRIMARY KEY, generations TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_last_used ON llm_responses(last_used)")
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(prompt, llm_string):
+        return hashlib.sha256(f"{llm_string}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt, llm_string):
+        key = self.make_key(prompt, llm_string)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT generations FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+            llm_span = current_span()
+            if llm_span is not None:
+                llm_span.set(cache_hit=row is not None)
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.conn.execute("UPDATE llm_responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+        return [loads(generation) for generation in json.loads(row[0])]
+
+    def update(self, prompt, llm_string, return_val):
+        key = self.make_key(prompt, llm_string)
+        payload = json.dumps([dumps(generation) for generation in return_val])
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, generations, last_used) VALUES (?, ?, ?)",
+                (key, payload, time.time()),
+            )
+            self.conn.execute(
+                "DELETE FROM llm_responses WHERE key IN ("
+                " SELECT key FROM llm_responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self.conn.commit()
+
+    def clear(self, **kwargs):
+        with self.lock:
+            self.conn.execute("DELETE FROM llm_responses")
+            self.conn.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+_llm_cache = None
+_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Shared response cache, or None when caching is disabled."""
+    global _llm_cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _lock:
+        if _llm_cache is None:
+            _llm_cache = SQLiteLLMCache()
+        return _llm_cache
@@ -1,57 +1,305 @@
 import os
+import uuid
+import time
+import threading
 from datetime import datetime
-from langchain_chroma import Chroma
-from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from resources import get_embeddings, get_vector_store
+from embedding_cache import EMBEDDING_MODEL, embedding_model_name
+from config import data_path
+from topic_index import TopicIndex, strip_html, DUPLICATE_JACCARD, EMBEDDING_THRESHOLD
 
 # Configuration
-MEMORY_DB_PATH = r"D:\NIE_GENai\Capstone_Project\NewsNexus\data\archive_memory"
+MEMORY_DB_PATH = data_path("archive_memory")
 COLLECTION_NAME = "newsletter_archive"
 
+# Archived newsletters are stored as plain-text chunks, embedded in batches
+ARCHIVE_CHUNK_SIZE = 1000
+ARCHIVE_CHUNK_OVERLAP = 100
+EMBED_BATCH_SIZE = 32
+
+# Retention: issues older than RETENTION_DAYS are dropped, and only the newest
+# MAX_ARCHIVED_ISSUES are kept, so the collection (and search latency) stays bounded
+RETENTION_DAYS = int(os.getenv("NEWSNEXUS_ARCHIVE_RETENTION_DAYS", "365"))
+MAX_ARCHIVED_ISSUES = int(os.getenv("NEWSNEXUS_ARCHIVE_MAX_ISSUES", "500"))
+
+# "Covered recently" window for check_memory, and the chunk distance that counts as covered
+CHECK_WINDOW_DAYS = 30
+CHUNK_DISTANCE_THRESHOLD = 0.4
+NO_PRIOR_COVERAGE = "No prior newsletters found on this topic. You are clear to proceed."
+
+
+def _created_at(metadata):
+    """Epoch seconds of an archive entry; legacy entries only carry the str(datetime) timestamp."""
+    if "created_at" in metadata:
+        return float(metadata["created_at"])
+    try:
+        return datetime.fromisoformat(metadata.get("timestamp", "")).timestamp()
+    except ValueError:
+        return 0.0
+
+
+def _since(within_days):
+    return None if within_days is None else time.time() - within_days * 86400
+
+
 class MemoryStore:
     def __init__(self):
-        # Initialize Ollama Embeddings for stability (nomic-embed-text)
-        from langchain_ollama import OllamaEmbeddings
-        self.embedding_fn = OllamaEmbeddings(model="nomic-embed-text")
+        # Shared Ollama Embeddings (nomic-embed-text) behind the on-disk embedding cache
+        self.embedding_fn = get_embeddings()
+        self.model_name = embedding_model_name()
         
-        # Connection to Archive Database
-        self.vector_store = Chroma(
-            collection_name=COLLECTION_NAME,
-            embedding_function=self.embedding_fn,
-            persist_directory=MEMORY_DB_PATH
-        )
+        # Pooled connection to Archive Database (opened once per process)
+        self.vector_store = get_vector_store(MEMORY_DB_PATH, COLLECTION_NAME)
+        self.text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=ARCHIVE_CHUNK_SIZE,
+            chunk_overlap=ARCHIVE_CHUNK_OVERLAP,
+            length_function=len,
+            is_separator_regex=False)
+
+        # Near-duplicate index over archived topics/bodies (MinHash LSH + cached topic embeddings)
+        self.topic_index = TopicIndex.load()
+        self.compact()
+
+    def _write_issue(self, issue_id, topic, text, timestamp, created_at):
+        """Chunks one newsletter's plain text and upserts the chunks, embedding EMBED_BATCH_SIZE at a time."""
+        chunks = self.text_splitter.split_text(text) or [text]
+        for start in range(0, len(chunks), EMBED_BATCH_SIZE):
+            batch = chunks[start:start + EMBED_BATCH_SIZE]
+            self.vector_store._collection.upsert(
+                ids=[f"{issue_id}-c{start + i}" for i in range(len(batch))],
+                embeddings=self.embedding_fn.embed_documents(batch),
+                documents=batch,
+                metadatas=[
+                    {
+                        "issue_id": issue_id,
+                        "topic": topic,
+                        "timestamp": timestamp,
+                        "created_at": created_at,
+                        "chunk": start + i,
+                        "embedding_model": self.model_name,
+                    }
+                    for i in range(len(batch))
+                ],
+            )
+        return len(chunks)
+
+    def delete_issues(self, issue_ids):
+        """Removes every chunk of the given issues from the archive and the topic index."""
+        issue_ids = list(issue_ids)
+        if not issue_ids:
+            return
+        self.vector_store._collection.delete(where={"issue_id": {"$in": issue_ids}})
+        self.topic_index.remove(issue_ids)
+
+    def compact(self, retention_days=RETENTION_DAYS, max_issues=MAX_ARCHIVED_ISSUES):
+        """
+        Retention/compaction job, run whenever the archive is opened:
+        re-chunks legacy whole-HTML entries, re-embeds chunks of another
+        embedding model, drops issues older than
+        retention_days, keeps only the newest max_issues and indexes any
+        issue missing from the topic index. Returns the number of issues removed.
+        """
+        collection = self.vector_store._collection
+        stored = collection.get(include=["metadatas"])
+
+        legacy = [doc_id for doc_id, metadata in zip(stored["ids"], stored["metadatas"]) if "issue_id" not in (metadata or {})]
+        if legacy:
+            print(f"[Memory] Re-chunking {len(legacy)} archived newsletters...")
+            old = collection.get(ids=legacy, include=["documents", "metadatas"])
+            for doc_id, content, metadata in zip(old["ids"], old["documents"], old["metadatas"]):
+                metadata = metadata or {}
+                collection.delete(ids=[doc_id])
+                self._write_issue(
+                    doc_id,
+                    metadata.get("topic", ""),
+                    strip_html(content),
+                    metadata.get("timestamp", "unknown date"),
+                    _created_at(metadata),
+                )
+            # Re-index them below with their numeric timestamps
+            self.topic_index.remove(legacy)
+            stored = collection.get(include=["metadatas"])
+
+        # Chunks written before the embedding backend was switched (entries without
+        # the field came from the default Ollama model)
+        stale = {
+            doc_id: metadata["issue_id"] for doc_id, metadata in zip(stored["ids"], stored["metadatas"])
+            if metadata.get("embedding_model", EMBEDDING_MODEL) != self.model_name
+        }
+        if stale:
+            print(f"[Memory] Re-embedding {len(stale)} archive chunks with {self.model_name}...")
+            stale_ids = list(stale)
+            for start in range(0, len(stale_ids), EMBED_BATCH_SIZE):
+                old = collection.get(ids=stale_ids[start:start + EMBED_BATCH_SIZE], include=["documents", "metadatas"])
+                collection.upsert(
+                    ids=old["ids"],
+                    embeddings=self.embedding_fn.embed_documents(old["documents"]),
+                    documents=old["documents"],
+                    metadatas=[dict(metadata, embedding_model=self.model_name) for metadata in old["metadatas"]],
+                )
+            # Their topic embeddings are recomputed by the backfill below
+            self.topic_index.remove(set(stale.values()))
+
+        issues = {}
+        for metadata in stored["metadatas"]:
+            issues[metadata["issue_id"]] = _created_at(metadata)
+
+        cutoff = _since(retention_days)
+        expired = {issue_id for issue_id, created in issues.items() if cutoff is not None and created < cutoff}
+        kept = sorted((created, issue_id) for issue_id, created in issues.items() if issue_id not in expired)
+        if max_issues is not None and len(kept) > max_issues:
+            expired.update(issue_id for _, issue_id in kept[:len(kept) - max_issues])
+        # Topic-index entries whose chunks are gone
+        expired.update(issue_id for issue_id, _ in self.topic_index.created_at() if issue_id not in issues)
+        if expired:
+            print(f"[Memory] Compacting archive: removing {len(expired)} issues...")
+            self.delete_issues(expired)
+
+        self._backfill_topic_index([issue_id for issue_id in issues if issue_id not in expired])
+        return len(expired)
+
+    def _backfill_topic_index(self, issue_ids):
+        """Indexes archived issues missing from the topic index."""
+        missing = [issue_id for issue_id in issue_ids if issue_id not in self.topic_index]
+        if missing:
+            print(f"[Memory] Indexing {len(missing)} archived newsletters for topic matching...")
+            stored = self.vector_store._collection.get(
+                where={"issue_id": {"$in": missing}}, include=["documents", "metadatas"]
+            )
+            grouped = {}
+            for text, metadata in zip(stored["documents"], stored["metadatas"]):
+                grouped.setdefault(metadata["issue_id"], []).append((metadata.get("chunk", 0), text, metadata))
+            grouped = {issue_id: sorted(chunks, key=lambda c: c[0]) for issue_id, chunks in grouped.items()}
+            topics = [chunks[0][2].get("topic", "") for chunks in grouped.values()]
+            # embed_query, as in save_memory/find_similar: topic vectors must share the query
+            # embedding space (and its cache) with the lookups they are compared against
+            vectors = [self.embedding_fn.embed_query(topic) for topic in topics]
+            for (issue_id, chunks), topic, vector in zip(grouped.items(), topics, vectors):
+                metadata = chunks[0][2]
+                self.topic_index.add(
+                    issue_id,
+                    topic,
+                    " ".join(text for _, text, _ in chunks),
+                    metadata.get("timestamp", "unknown date"),
+                    vector,
+                    _created_at(metadata),
+                )
+        self.topic_index.save()
 
     def save_memory(self, topic: str, content: str):
         """Saves a finished newsletter to the vector store."""
         print(f"\n[Memory] Archiving newsletter on '{topic}'...")
         
-        doc = Document(
-            page_content=content,
-            metadata={"topic": topic, "timestamp": str(datetime.now())}
+        now = datetime.now()
+        issue_id = uuid.uuid4().hex
+        text = strip_html(content)
+        chunks = self._write_issue(issue_id, topic, text, str(now), now.timestamp())
+        self.topic_index.add(issue_id, topic, text, str(now), self.embedding_fn.embed_query(topic), now.timestamp())
+
+        # Cheap size cap on every write; the full retention pass runs in compact()
+        archived = self.topic_index.created_at()
+        if len(archived) > MAX_ARCHIVED_ISSUES:
+            self.delete_issues(issue_id for issue_id, _ in archived[:len(archived) - MAX_ARCHIVED_ISSUES])
+        self.topic_index.save()
+        print(f"[Memory] Successfully saved ({chunks} chunks).")
+
+    def similar_issues(self, query: str, n=3, within_days=None):
+        """
+        Top-n archived issues for a topic as (issue, score, method) triples.
+        Close lexical matches are found from MinHash LSH without a model call;
+        otherwise the (cached) topic embedding is compared to archived ones.
+        """
+        return self.topic_index.find_similar(
+            query, n=n, embed_query=self.embedding_fn.embed_query, since=_since(within_days)
         )
-        
-        self.vector_store.add_documents([doc])
-        print("[Memory] Successfully saved.")
 
-    def check_memory(self, query: str, k=1) -> str:
+    def search_archive(self, query: str, k=3, within_days=None):
+        """
+        Chunk-level search over archived newsletters, aggregated per issue.
+        Returns up to k dicts (topic, timestamp, best chunk distance, number of
+        matching chunks, best passage), closest issue first.
+        """
+        since = _since(within_days)
+        results = self.vector_store.similarity_search_with_score(
+            query, k=k * 4, filter={"created_at": {"$gte": since}} if since is not None else None
+        )
+        issues = {}
+        for doc, distance in results:
+            issue_id = doc.metadata.get("issue_id")
+            entry = issues.get(issue_id)
+            if entry is None:
+                issues[issue_id] = {
+                    "id": issue_id,
+                    "topic": doc.metadata.get("topic", ""),
+                    "timestamp": doc.metadata.get("timestamp", "unknown date"),
+                    "distance": distance,
+                    "matched_chunks": 1,
+                    "passage": doc.page_content,
+                }
+            else:
+                entry["matched_chunks"] += 1
+                if distance < entry["distance"]:
+                    entry["distance"], entry["passage"] = distance, doc.page_content
+        return sorted(issues.values(), key=lambda entry: entry["distance"])[:k]
+
+    def check_memory(self, query: str, k=3, within_days=CHECK_WINDOW_DAYS) -> str:
         """
-        Searches past newsletters to see if we've covered this recently.
+        Searches past newsletters to see if we've covered this recently
+        (within the last `within_days` days; None searches the whole archive).
         Returns a summary string to inject into the Agent's context.
+
+        The topic index mirrors the archive, so with no issue in the window there
+        is nothing to find and neither the topic embedding nor the Chroma query
+        runs. Otherwise a topic that matches no issue still gets the chunk search:
+        that extra query is deliberate, since it catches subjects covered inside
+        a newsletter with a different headline.
         """
-        # Similarity search returns documents and scores
-        # Note: LangChain Chroma's similarity_search handles embedding automatically
-        results = self.vector_store.similarity_search_with_score(query, k=k)
+        since = _since(within_days)
+        if not any(since is None or created >= since for _, created in self.topic_index.created_at()):
+            return NO_PRIOR_COVERAGE
+
+        covered = [
+            (issue, score) for issue, score, method in self.similar_issues(query, n=k, within_days=within_days)
+            if score >= (DUPLICATE_JACCARD if method == "minhash" else EMBEDDING_THRESHOLD)
+        ]
         
-        if results:
-            doc, score = results[0]
-            # In Chroma (Distance), lower score is more similar. 
-            # 0.4 is a reasonable threshold for "same topic"
-            if score < 0.4:
-                past_content = doc.page_content
-                metadata = doc.metadata
-                date = metadata.get("timestamp", "unknown date")
-                return f"WARNING: We already wrote a newsletter on this topic on {date}. \nSummary of past content: {past_content[:300]}..."
+        if covered:
+            issue, _ = covered[0]
+            date = issue["timestamp"]
+            report = f"WARNING: We already wrote a newsletter on this topic on {date}. \nSummary of past content: {issue['snippet']}..."
+            if len(covered) > 1:
+                report += "\nOther related issues: " + "; ".join(
+                    f"'{other['topic']}' ({other['timestamp']}, similarity {score:.2f})" for other, score in covered[1:]
+                )
+            return report
+
+        # No issue with a matching topic: look for the subject inside recent newsletters
+        passages = [
+            entry for entry in self.search_archive(query, k=k, within_days=within_days)
+            if entry["distance"] < CHUNK_DISTANCE_THRESHOLD
+        ]
+        if passages:
+            best = passages[0]
+            return (
+                f"WARNING: Our '{best['topic']}' newsletter of {best['timestamp']} already covered this "
+                f"({best['matched_chunks']} matching passages). \nRelevant passage: {best['passage'][:300]}..."
+            )
         
-        return "No prior newsletters found on this topic. You are clear to proceed."
+        return NO_PRIOR_COVERAGE
+
+_memory_store = None
+_memory_store_lock = threading.Lock()
+
+
+def get_memory_store():
+    """Process-wide MemoryStore, opened on first use."""
+    global _memory_store
+    with _memory_store_lock:
+        if _memory_store is None:
+            _memory_store = MemoryStore()
+        return _memory_store
+
 
 # Test block
 if __name__ == "__main__":
@@ -0,0 +1,139 @@
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from langchain_core.embeddings import Embeddings
+from config import data_path
+
+# Configuration (selected with NEWSNEXUS_EMBEDDING_BACKEND=onnx, see embedding_cache.py)
+ONNX_MODEL = os.getenv("NEWSNEXUS_ONNX_MODEL", "nomic-ai/nomic-embed-text-v1.5")
+ONNX_MODEL_DIR = data_path("onnx_models")
+ONNX_QUANTIZE = os.getenv("NEWSNEXUS_ONNX_QUANTIZE", "1") == "1"
+ONNX_THREADS = int(os.getenv("NEWSNEXUS_ONNX_THREADS", "0")) or os.cpu_count() or 1
+MAX_LENGTH = 512
+
+# Dynamic batching: texts are sorted by length and packed into batches of at most
+# MAX_BATCH_SIZE texts and MAX_BATCH_TOKENS padded tokens, so short chunks are not
+# padded to the longest one in the whole call.
+MAX_BATCH_SIZE = 64
+MAX_BATCH_TOKENS = 16384
+# Concurrent embed_query() calls arriving within this window share one forward pass
+QUERY_BATCH_WAIT = 0.005
+
+# nomic-embed-text is trained with task prefixes
+DOCUMENT_PREFIX = "search_document: "
+QUERY_PREFIX = "search_query: "
+
+
+def quantize_model(source, target):
+    """Dynamic int8 quantization of the weights (activations stay float)."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    tmp_path = target + ".tmp"
+    quantize_dynamic(source, tmp_path, weight_type=QuantType.QInt8)
+    os.replace(tmp_path, target)
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    In-process sentence embeddings with onnxruntime on CPU: the model's ONNX
+    export is downloaded from the Hugging Face hub once, optionally quantized
+    to int8, and run with mean pooling + L2 normalisation.
+    """
+
+    def __init__(self, model_id=ONNX_MODEL, quantize=ONNX_QUANTIZE, threads=ONNX_THREADS):
+        import onnxruntime as ort
+        from huggingface_hub import hf_hub_download
+        from tokenizers import Tokenizer
+
+        self.model_id = model_id
+        self.model_name = f"onnx:{model_id}" + (":int8" if quantize else "")
+
+        local_dir = os.path.join(ONNX_MODEL_DIR, model_id.replace("/", "--"))
+        model_path = hf_hub_download(model_id, "onnx/model.onnx", local_dir=local_dir)
+        tokenizer_path = hf_hub_download(model_id, "tokenizer.json", local_dir=local_dir)
+        if quantize:
+            quantized_path = os.path.join(local_dir, "model-int8.onnx")
+            if not os.path.exists(quantized_path):
+                print(f"Quantizing {model_id} to int8 (one-off)...")
+                quantize_model(model_path, quantized_path)
+            model_path = quantized_path
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(MAX_LENGTH)
+        self.tokenizer.no_padding()
+
+        self._queries = queue.Queue()
+        threading.Thread(target=self._query_worker, name="onnx-query-batcher", daemon=True).start()
+
+    def _forward(self, encodings):
+        """One padded batch through the model; returns L2-normalised mean-pooled vectors."""
+        import numpy as np
+
+        width = max(len(e.ids) for e in encodings)
+        ids = np.zeros((len(encodings), width), dtype=np.int64)
+        mask = np.zeros((len(encodings), width), dtype=np.int64)
+        for row, encoding in enumerate(encodings):
+            ids[row, :len(encoding.ids)] = encoding.ids
+            mask[row, :len(encoding.ids)] = 1
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(ids)
+
+        hidden = self.session.run(None, feeds)[0]
+        weights = mask[:, :, None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        pooled /= np.linalg.norm(pooled, axis=1, keepdims=True) + 1e-12
+        return pooled
+
+    def _encode(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        order = sorted(range(len(texts)), key=lambda i: len(encodings[i].ids))
+        vectors = [None] * len(texts)
+
+        batch = []
+        for i in order:
+            # Sorted by length, so the newest text sets the batch's padded width
+            width = len(encodings[i].ids)
+            if batch and (len(batch) >= MAX_BATCH_SIZE or (len(batch) + 1) * width > MAX_BATCH_TOKENS):
+                for j, vector in zip(batch, self._forward([encodings[j] for j in batch])):
+                    vectors[j] = vector.tolist()
+                batch = []
+            batch.append(i)
+        if batch:
+            for j, vector in zip(batch, self._forward([encodings[j] for j in batch])):
+                vectors[j] = vector.tolist()
+        return vectors
+
+    def _query_worker(self):
+        while True:
+            pending = [self._queries.get()]
+            try:
+                while len(pending) < MAX_BATCH_SIZE:
+                    pending.append(self._queries.get(timeout=QUERY_BATCH_WAIT))
+            except queue.Empty:
+                pass
+            try:
+                vectors = self._encode([QUERY_PREFIX + text for text, _ in pending])
+                for (_, future), vector in zip(pending, vectors):
+                    future.set_result(vector)
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+
+    def embed_documents(self, texts):
+        if not texts:
+            return []
+        return self._encode([DOCUMENT_PREFIX + text for text in texts])
+
+    def embed_query(self, text):
+        future = Future()
+        self._queries.put((text, future))
+        return future.result()
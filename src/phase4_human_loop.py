@@ -1,8 +1,8 @@
 import operator
 from typing import Literal
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
 from langchain_core.messages import HumanMessage
+from checkpointing import get_checkpointer
 
 # Import your existing nodes
 from agents import (
@@ -62,7 +62,8 @@ workflow.add_conditional_edges(
 # =====================================================
 # Memory + Interrupt Configuration
 # =====================================================
-memory = MemorySaver()
+# Durable SQLite checkpointer (WAL, latest N checkpoints kept per thread)
+memory = get_checkpointer()
 
 app = workflow.compile(
     checkpointer=memory,
@@ -75,19 +76,25 @@ app = workflow.compile(
 if __name__ == "__main__":
 
     print("==============================================")
-    topic = input("Enter a topic (e.g., AI trends 2026): ")
-
     config = {"configurable": {"thread_id": "hitl_session"}}
 
-    inputs = {
-        "messages": [HumanMessage(content=topic)],
-        "researcher_data": [],
-        "chart_data": []
-    }
-
-    # Run until human approval interrupt
-    for _ in app.stream(inputs, config):
-        pass
+    # A paused review survives restarts; offer to pick it up where it stopped
+    paused = app.get_state(config).next
+    if paused and input("Resume the paused review session? (y/n): ").strip().lower().startswith("y"):
+        print("\nResuming saved session...")
+    else:
+        memory.delete_thread("hitl_session")
+        topic = input("Enter a topic (e.g., AI trends 2026): ")
+
+        inputs = {
+            "messages": [HumanMessage(content=topic)],
+            "researcher_data": [],
+            "chart_data": []
+        }
+
+        # Run until human approval interrupt
+        for _ in app.stream(inputs, config):
+            pass
 
     while True:
         state = app.get_state(config)
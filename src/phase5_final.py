@@ -1,31 +1,29 @@
-import sys
 from typing import Literal
 
 # LangGraph Imports
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
 from langchain_core.messages import HumanMessage, SystemMessage
 
 # Import our Memory Manager
-from memory_store import MemoryStore
+from memory_store import get_memory_store
+from checkpointing import get_checkpointer
 
 # Import existing logic (Reusing your work!)
 from agents import (
     AgentState, 
     analyst_node, 
     writer_node, 
-    llm_with_tools, 
-    lookup_policy_docs, 
-    web_search_stub,
-    rss_feed_search
+    get_tool_llm
 )
+from tools import run_tool_calls
+from tracing import span, traced_node, traced_invoke
 
-# Initialize Memory
-memory_store = MemoryStore()
+# Memory archive is opened on first use (see memory_store.get_memory_store)
 
 # --- 1. Define the NEW Memory-Aware Researcher ---
 # We are replacing the old researcher_node with this smarter one.
 
+@traced_node("Researcher")
 def researcher_with_memory_node(state: AgentState):
     print("\n--- [Agent: Researcher + Memory] is starting ---")
     
@@ -34,7 +32,8 @@ def researcher_with_memory_node(state: AgentState):
     user_topic = last_message.content
     
     print(f"   > Checking archive for '{user_topic}'...")
-    memory_context = memory_store.check_memory(user_topic)
+    with span("check_memory", kind="memory"):
+        memory_context = get_memory_store().check_memory(user_topic)
     print(f"   > Memory Report: {memory_context}")
     
     # 2. Update System Prompt with Memory Context (Synced with agents.py)
@@ -50,16 +49,17 @@ def researcher_with_memory_node(state: AgentState):
     If the memory says we already covered this recently, mention it in your findings and prioritize finding NEW information."""
     
     # 3. Standard Agent Execution (Same as before)
-    response = llm_with_tools.invoke([SystemMessage(content=system_prompt), last_message])
+    response = traced_invoke(get_tool_llm(), [SystemMessage(content=system_prompt), last_message], "researcher_llm")
     
     research_findings = []
     
-    # Tool Execution Loop
+    # Tool Execution Loop (queries are resolved first, then all tools run concurrently)
     if hasattr(response, 'tool_calls') and response.tool_calls:
+        calls = []
         for tool_call in response.tool_calls:
             tool_name = tool_call["name"]
             tool_args = tool_call["args"]
-            print(f"   > Executing Tool: {tool_name}")
+            print(f"   > Dispatching Tool: {tool_name}")
             
             q = tool_args.get('query')
             if isinstance(q, dict): q = q.get('value', str(q))
@@ -68,15 +68,9 @@ def researcher_with_memory_node(state: AgentState):
             if not q or q == "{'type': 'string'}":
                 q = tool_args.get('__arg1', tool_args.get('input', user_topic))
                 
-            q = str(q)
-
-            if tool_name == "lookup_policy_docs":
-                res = lookup_policy_docs.invoke(q)
-            elif tool_name == "web_search_stub":
-                res = web_search_stub.invoke(q)
-            elif tool_name == "rss_feed_search":
-                res = rss_feed_search.invoke(q)
-            
+            calls.append((tool_name, str(q)))
+
+        for tool_name, res in run_tool_calls(calls):
             research_findings.append(f"Source: {tool_name}\nData: {res}")
     else:
         # If the agent decided NOT to call tools, we report that.
@@ -113,7 +107,7 @@ workflow.add_edge("Analyst", "Writer")
 workflow.add_edge("Writer", "human_approval")
 workflow.add_conditional_edges("human_approval", route_after_human)
 
-memory = MemorySaver()
+memory = get_checkpointer()
 app = workflow.compile(checkpointer=memory, interrupt_before=["human_approval"])
 
 # --- 4. Main Execution Loop ---
@@ -123,15 +117,22 @@ if __name__ == "__main__":
     print("   NEWS NEXUS FINAL: MEMORY & PERSISTENCE")
     print("===============================================")
     
-    # Ask for topic
-    user_topic = input("Enter topic: ")
-    
     config = {"configurable": {"thread_id": "final_session"}}
-    inputs = {"messages": [HumanMessage(content=user_topic)], "research_data": []}
     
-    # Run to Gate
-    for output in app.stream(inputs, config):
-        pass
+    # Paused drafts are checkpointed to disk, so they can be resumed after a restart
+    if app.get_state(config).next and input("Resume the paused draft? (y/n): ").strip().lower().startswith("y"):
+        user_topic = app.get_state(config).values["messages"][0].content
+        print(f"\n[System] Resuming '{user_topic}'...")
+    else:
+        memory.delete_thread("final_session")
+        
+        # Ask for topic
+        user_topic = input("Enter topic: ")
+        inputs = {"messages": [HumanMessage(content=user_topic)], "research_data": []}
+        
+        # Run to Gate
+        for output in app.stream(inputs, config):
+            pass
     
     while True:
         state = app.get_state(config)
@@ -147,7 +148,7 @@ if __name__ == "__main__":
             print("\n[System] Publishing...")
             
             # --- STEP 5.1: SAVE TO LONG TERM MEMORY ---
-            memory_store.save_memory(user_topic, draft)
+            get_memory_store().save_memory(user_topic, draft)
             print("[System] This newsletter has been archived to Long-Term Memory.")
             break
         else:
@@ -0,0 +1,133 @@
+import os
+import threading
+from contextlib import contextmanager
+from embedding_cache import get_embedding_function
+
+# Process-wide registry of long-lived client handles.
+# Opening a Chroma collection is far more expensive than querying it, so every
+# module asks here instead of constructing its own Chroma(...) per call.
+_lock = threading.Lock()
+_vector_stores = {}
+
+
+_chat_model_factory = None
+_chat_model = None
+
+
+def get_chat_model():
+    """Chat model used by every agent: llama3.2 via Ollama at temperature 0, built on first use."""
+    global _chat_model
+    with _lock:
+        if _chat_model is None:
+            if _chat_model_factory is not None:
+                _chat_model = _chat_model_factory()
+            else:
+                from langchain_ollama import ChatOllama
+                from llm_cache import get_llm_cache
+                # Shares the opt-in response cache (NEWSNEXUS_LLM_CACHE=1)
+                _chat_model = ChatOllama(model="llama3.2", temperature=0, cache=get_llm_cache())
+        return _chat_model
+
+
+def set_chat_model_factory(factory):
+    """Makes get_chat_model() return factory() instead of ChatOllama (benchmarks, tests)."""
+    global _chat_model_factory, _chat_model
+    with _lock:
+        _chat_model_factory = factory
+        _chat_model = None
+
+
+# Optional process-wide cap on concurrent chat-model calls (batch runs); None = unlimited
+_llm_slots = None
+
+
+def set_llm_concurrency(limit):
+    """Allows at most `limit` chat-model calls in flight at once (None or 0 removes the cap)."""
+    global _llm_slots
+    _llm_slots = threading.BoundedSemaphore(limit) if limit else None
+
+
+@contextmanager
+def llm_slot():
+    """Holds one LLM concurrency slot for the duration of the block (no-op when uncapped)."""
+    slots = _llm_slots
+    if slots is None:
+        yield
+        return
+    with slots:
+        yield
+
+
+def get_embeddings():
+    """Shared embedding client (cached nomic-embed-text)."""
+    return get_embedding_function()
+
+
+def get_vector_store(persist_directory, collection_name=None):
+    """Returns the open Chroma handle for a directory/collection, creating it on first use."""
+    key = (os.path.abspath(persist_directory), collection_name)
+    with _lock:
+        store = _vector_stores.get(key)
+        if store is None:
+            from langchain_chroma import Chroma
+            kwargs = {"collection_name": collection_name} if collection_name else {}
+            store = Chroma(
+                persist_directory=persist_directory,
+                embedding_function=get_embeddings(),
+                **kwargs
+            )
+            _vector_stores[key] = store
+        return store
+
+
+def refresh_vector_stores(persist_directory=None):
+    """
+    Drops cached handles (all of them, or those of one directory) so the next
+    get_vector_store() reopens the collection. Called after the index is rebuilt.
+    """
+    with _lock:
+        for key in list(_vector_stores):
+            if persist_directory is None or key[0] == os.path.abspath(persist_directory):
+                del _vector_stores[key]
+
+
+_lexical_indexes = {}
+
+
+def get_lexical_index(path=None):
+    """Returns the BM25 index persisted at `path` (defaults to the one next to chroma_db), opened once."""
+    from lexical_index import BM25_PATH, BM25Index
+    path = os.path.abspath(path or BM25_PATH)
+    with _lock:
+        index = _lexical_indexes.get(path)
+        if index is None:
+            index = BM25Index(path)
+            _lexical_indexes[path] = index
+        return index
+
+
+def refresh_lexical_index():
+    """Drops loaded BM25 indexes so the next lookup reloads them from disk."""
+    with _lock:
+        _lexical_indexes.clear()
+
+
+_flat_indexes = {}
+
+
+def get_flat_index(path=None):
+    """Returns the memory-mapped flat vector index at `path` (defaults to data/flat_index), opened once."""
+    from flat_index import FLAT_INDEX_PATH, FlatVectorIndex
+    path = os.path.abspath(path or FLAT_INDEX_PATH)
+    with _lock:
+        index = _flat_indexes.get(path)
+        if index is None:
+            index = FlatVectorIndex(path, embeddings=get_embeddings())
+            _flat_indexes[path] = index
+        return index
+
+
+def refresh_flat_index():
+    """Drops opened flat indexes so the next lookup maps the rebuilt files."""
+    with _lock:
+        _flat_indexes.clear()
@@ -1,24 +1,164 @@
 import os
 import sys
-from langchain_chroma import Chroma
-from langchain_ollama import OllamaEmbeddings
+from contextvars import copy_context
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.documents import Document
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-DB_PATH=r"D:\Python-Project\news-nexus\data\chroma_db"
-def retrieve_documents(query, k=4, keywords_filter=True):
-    embedding_model = OllamaEmbeddings(model="nomic-embed-text")
-    vector_store = Chroma(
-        persist_directory=DB_PATH,
-        embedding_function=embedding_model
-    )
+from resources import get_vector_store, get_lexical_index, get_flat_index
+from flat_index import VECTOR_BACKEND, FlatVectorIndex
+from config import data_path
+from tracing import span
+DB_PATH=data_path("chroma_db")
 
-    results = vector_store.similarity_search_with_score(query, k=k+2)
+# Reciprocal-rank fusion constant (60 is the value from the original RRF paper)
+RRF_K = 60
 
-    final_results = []
+# Diversity pass: MMR trade-off (1.0 = pure relevance) and cosine similarity
+# above which a candidate counts as a near-copy of an already selected chunk
+MMR_LAMBDA = 0.7
+DEDUP_THRESHOLD = 0.95
+MMR_FETCH_K = 20
 
-    for doc, score in results:
-        final_results.append((doc, score))
+_search_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="retrieval")
 
-    return final_results[:k]
+
+def mmr_select(relevance, embeddings, k, lambda_mult=MMR_LAMBDA, dedup_threshold=DEDUP_THRESHOLD):
+    """
+    Maximal marginal relevance over candidate embeddings.
+    Returns the indices of up to k candidates; anything with cosine similarity
+    >= dedup_threshold to a selected candidate is dropped outright.
+    """
+    import numpy as np
+
+    if len(relevance) == 0:
+        return []
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+    similarity = vectors @ vectors.T
+    relevance = np.asarray(relevance, dtype=np.float32)
+
+    selected = []
+    available = np.ones(len(relevance), dtype=bool)
+    redundancy = np.zeros(len(relevance), dtype=np.float32)
+    while len(selected) < k and available.any():
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        available &= similarity[best] < dedup_threshold
+        redundancy = np.maximum(redundancy, similarity[best])
+    return selected
+
+
+def _library_store():
+    """Flat memmap index when configured and built, otherwise the Chroma collection."""
+    if VECTOR_BACKEND == "flat" and FlatVectorIndex.exists():
+        return get_flat_index()
+    return get_vector_store(DB_PATH)
+
+
+def _stored_chunks(vector_store, ids):
+    """{id: (Document, stored embedding)} for ids present in the store."""
+    if isinstance(vector_store, FlatVectorIndex):
+        return vector_store.get_chunks(ids)
+    stored = vector_store._collection.get(ids=ids, include=["documents", "metadatas", "embeddings"])
+    return {
+        doc_id: (Document(page_content=text, metadata=metadata or {}), embedding)
+        for doc_id, text, metadata, embedding in zip(
+            stored["ids"], stored["documents"], stored["metadatas"], stored["embeddings"]
+        )
+    }
+
+
+def _vector_candidates(vector_store, query, fetch_k):
+    """Vector leg: one query embedding, results come back with their stored embeddings."""
+    query_vector = vector_store.embeddings.embed_query(query)
+    if isinstance(vector_store, FlatVectorIndex):
+        with span("vector_search", kind="vector_store", fetch_k=fetch_k, backend="flat"):
+            hits = vector_store.search_by_vector(query_vector, fetch_k)
+            rows = vector_store.rows([row for row, _ in hits])
+        return query_vector, [
+            {"id": rows[row][0], "doc": rows[row][1], "distance": distance, "embedding": vector_store.vector(row)}
+            for row, distance in hits
+        ]
+
+    with span("vector_search", kind="vector_store", fetch_k=fetch_k):
+        res = vector_store._collection.query(
+            query_embeddings=[query_vector],
+            n_results=fetch_k,
+            include=["documents", "metadatas", "distances", "embeddings"],
+        )
+    candidates = []
+    for doc_id, text, metadata, distance, embedding in zip(
+        res["ids"][0], res["documents"][0], res["metadatas"][0], res["distances"][0], res["embeddings"][0]
+    ):
+        doc = Document(page_content=text, metadata=metadata or {})
+        candidates.append({"id": doc_id, "doc": doc, "distance": distance, "embedding": embedding})
+    return query_vector, candidates
+
+
+def _lexical_search(query, k):
+    """BM25 leg: ranked chunk ids (the texts are read from the vector store only for lexical-only hits)."""
+    with span("bm25_search", kind="lexical", k=k):
+        return [doc_id for doc_id, _ in get_lexical_index().search(query, k)]
+
+
+def retrieve_documents(query, k=4, keywords_filter=True, diversity_lambda=MMR_LAMBDA, dedup_threshold=DEDUP_THRESHOLD):
+    """
+    Returns up to k diverse (Document, score) pairs.
+    With keywords_filter, a BM25 leg runs next to the vector search and the two
+    rankings are merged with reciprocal-rank fusion (score = fused RRF score,
+    higher is better). Without it, vector search distances are returned.
+    Candidates are over-fetched, then an MMR/near-duplicate pass picks the top k
+    using the stored embeddings (Chroma or the flat index), so nothing is embedded twice.
+    Lexical-only hits are read from the same store, which holds the chunk texts.
+    """
+    import numpy as np
+
+    # Long-lived handle from the registry; only the query embedding is paid per call
+    vector_store = _library_store()
+
+    fetch_k = max(MMR_FETCH_K, k * 4)
+    vector_leg = _search_pool.submit(copy_context().run, _vector_candidates, vector_store, query, fetch_k)
+    lexical_leg = _search_pool.submit(copy_context().run, _lexical_search, query, fetch_k) if keywords_filter else None
+    query_vector, candidates = vector_leg.result()
+
+    if lexical_leg is None:
+        if not candidates:
+            return []
+        embeddings = np.asarray([c["embedding"] for c in candidates], dtype=np.float32)
+        query_vector = np.asarray(query_vector, dtype=np.float32)
+        relevance = embeddings @ query_vector / (
+            np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query_vector) + 1e-12
+        )
+        picked = mmr_select(relevance, embeddings, k, diversity_lambda, dedup_threshold)
+        return [(candidates[i]["doc"], candidates[i]["distance"]) for i in picked]
+
+    fused = {}
+    for rank, candidate in enumerate(candidates):
+        fused[candidate["id"]] = dict(candidate, score=1.0 / (RRF_K + rank + 1))
+    for rank, doc_id in enumerate(lexical_leg.result()):
+        entry = fused.setdefault(doc_id, {"id": doc_id, "doc": None, "embedding": None, "score": 0.0})
+        entry["score"] += 1.0 / (RRF_K + rank + 1)
+
+    ranked = sorted(fused.values(), key=lambda c: c["score"], reverse=True)[:fetch_k]
+    if not ranked:
+        return []
+
+    # Lexical-only hits: read their text and stored vector instead of embedding them again
+    missing = [c["id"] for c in ranked if c["embedding"] is None]
+    if missing:
+        by_id = _stored_chunks(vector_store, missing)
+        ranked = [c for c in ranked if c["embedding"] is not None or c["id"] in by_id]
+        for c in ranked:
+            if c["embedding"] is None:
+                c["doc"], c["embedding"] = by_id[c["id"]]
+
+    scores = np.asarray([c["score"] for c in ranked], dtype=np.float32)
+    relevance = scores / scores.max()
+    picked = mmr_select(relevance, [c["embedding"] for c in ranked], k, diversity_lambda, dedup_threshold)
+    return [(ranked[i]["doc"], ranked[i]["score"]) for i in picked]
 
 if __name__ == "__main__":
     test_query = "What is the impact of GenAI on productivity?"
@@ -0,0 +1,137 @@
+import re
+from contextvars import copy_context
+from concurrent.futures import ThreadPoolExecutor
+from lexical_index import tokenize
+from tracing import traced_invoke
+
+# Words that describe *how* to edit rather than *what* to edit; they never target a section
+EDIT_WORDS = {
+    "make", "more", "less", "tone", "section", "sections", "please", "add", "remove", "change",
+    "shorter", "longer", "formal", "informal", "casual", "paragraph", "paragraphs", "newsletter",
+    "rewrite", "improve", "better", "should", "could", "would", "can", "all", "each", "whole",
+}
+# Words that point at the preamble's visible part; only these put it up for revision
+PREAMBLE_WORDS = {"title", "headline", "intro", "introduction", "opening", "lead"}
+SECTION_BOUNDARY = re.compile(r"(?=<h2[\s>])", re.IGNORECASE)
+SECTION_START = re.compile(r"<h2[\s>]", re.IGNORECASE)
+# End of the markup before the visible content (doctype, <head>, <style>); never sent for revision
+BODY_START = re.compile(r"<body[^>]*>", re.IGNORECASE)
+# Where the document trailer starts in the last section: footer, closing body/html tags
+TRAILER_START = re.compile(r"<footer[\s>]|</body\s*>|</html\s*>", re.IGNORECASE)
+TAG_PATTERN = re.compile(r"<[^>]+>")
+CODE_FENCE = re.compile(r"^```(?:html)?\s*|\s*```$")
+# Run metadata naming the section an LLM call revises, so streamed tokens can be told apart
+SECTION_METADATA_KEY = "revision_section"
+
+
+def split_sections(html):
+    """
+    Splits a draft before every <h2> and cuts the document trailer (footer,
+    </body></html>) off the last section. Returns (sections, trailer); the first
+    section is the preamble (head, title, intro) and "".join(sections) + trailer
+    always reproduces the draft exactly.
+    """
+    sections = [part for part in SECTION_BOUNDARY.split(html) if part]
+    trailer = ""
+    if sections:
+        match = TRAILER_START.search(sections[-1])
+        if match:
+            trailer = sections[-1][match.start():]
+            sections[-1] = sections[-1][:match.start()]
+            if not sections[-1]:
+                sections.pop()
+    return sections, trailer
+
+
+def _text(html):
+    return TAG_PATTERN.sub(" ", html)
+
+
+def _heading(section):
+    match = re.search(r"<h2[^>]*>(.*?)</h2>", section, re.IGNORECASE | re.DOTALL)
+    return _text(match.group(1)) if match else ""
+
+
+def select_sections(sections, feedback):
+    """
+    Indices of the sections the feedback is about: those whose heading shares a
+    content word with it, else those whose body does. Feedback that names no
+    section (e.g. "make the tone more formal") targets every <h2> section with
+    text. The preamble (head, styles, <h1>, intro) is only included when the
+    feedback names it, e.g. "shorten the intro".
+    """
+    keywords = set(tokenize(feedback)) - EDIT_WORDS
+    first = 1 if sections and not SECTION_START.match(sections[0]) else 0
+    with_text = [i for i in range(first, len(sections)) if _text(sections[i]).strip()]
+    preamble = [0] if first and keywords & PREAMBLE_WORDS else []
+
+    content_words = keywords - PREAMBLE_WORDS
+    if content_words:
+        by_heading = [i for i in with_text if content_words & set(tokenize(_heading(sections[i])))]
+        if by_heading:
+            return preamble + by_heading
+        by_body = [i for i in with_text if content_words & set(tokenize(_text(sections[i])))]
+        if by_body:
+            return preamble + by_body
+    return preamble or with_text
+
+
+def revise_section(llm, section, feedback, analysis, index=None):
+    """
+    Regenerates one section. The markup before <body> (only in the preamble) and
+    the section's surrounding whitespace are kept as they were, so the joins
+    with the untouched neighbouring sections do not change.
+    """
+    match = BODY_START.search(section)
+    head, section = (section[:match.end()], section[match.end():]) if match else ("", section)
+    content = section.strip()
+    if not content:
+        return head + section
+    leading = section[:len(section) - len(section.lstrip())]
+    trailing = section[len(section.rstrip()):]
+
+    prompt = f"""
+You are a newsletter editor revising ONE section of an HTML newsletter.
+
+Apply the reviewer feedback to this section only.
+- Keep the facts consistent with the analysis below
+- Keep every <a href="URL">Title</a> link
+- Return ONLY the revised HTML of this section, no commentary
+
+REVIEWER FEEDBACK:
+{feedback}
+
+TRENDS & ANALYSIS:
+{analysis}
+
+SECTION HTML:
+{content}
+"""
+    if index is not None:
+        llm = llm.with_config(metadata={SECTION_METADATA_KEY: index})
+    response = traced_invoke(llm, prompt, "writer_section_llm")
+    return head + leading + CODE_FENCE.sub("", response.content.strip()) + trailing
+
+
+def revise_draft(llm, draft, feedback, analysis):
+    """
+    Regenerates only the sections targeted by the feedback (concurrently) and
+    reuses every other section, and the trailer, verbatim. Returns
+    (new_html, revised_indices).
+    """
+    sections, trailer = split_sections(draft)
+    targets = select_sections(sections, feedback)
+    if not targets:
+        return draft, []
+
+    # Each worker runs in a copy of the caller's context so LangGraph callbacks (token streaming) still apply;
+    # the sections stream concurrently, so each call carries its index in SECTION_METADATA_KEY
+    with ThreadPoolExecutor(max_workers=min(4, len(targets))) as pool:
+        futures = [
+            pool.submit(copy_context().run, revise_section, llm, sections[i], feedback, analysis, i)
+            for i in targets
+        ]
+        for i, future in zip(targets, futures):
+            sections[i] = future.result()
+
+    return "".join(sections) + trailer, targets
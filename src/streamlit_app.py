@@ -5,16 +5,39 @@ from datetime import datetime
 
 # --- Import our Backend Logic ---
 # We assume these files exist from previous steps
-from ingestion import ingest_documents
-from tools import get_llm_with_tools, lookup_policy_docs, web_search_stub
-from agents import app as agent_app  # Import the graph we built
-from memory_store import MemoryStore
+# Heavy modules (graph, models, vector stores) are loaded on first use below,
+# so the page renders before any of them is initialised
 from langchain_core.messages import HumanMessage
+import tracing
+from revision import SECTION_METADATA_KEY
 
-# --- Paths Configuration ---
-PROJECT_ROOT = r"D:\NIE_GENai\Capstone_Project\NewsNexus"
-DATA_PATH = os.path.join(PROJECT_ROOT, "data", "raw_pdfs")
-DB_PATH = os.path.join(PROJECT_ROOT, "data", "chroma_db")
+# --- Paths Configuration (shared with ingestion/retrieval, see config.py) ---
+from config import data_path
+DATA_PATH = data_path("raw_pdfs")
+DB_PATH = data_path("chroma_db")
+
+
+@st.cache_resource(show_spinner="Loading agents...")
+def get_agent_app():
+    """
+    The agents graph with its human review gate, built once per server process.
+    Runs pause before human_approval and are checkpointed to disk per thread_id,
+    so a review survives a Streamlit restart.
+    """
+    from agents import compile_review_app
+    from checkpointing import get_checkpointer
+    return compile_review_app(get_checkpointer())
+
+
+@st.cache_resource(show_spinner="Opening newsletter archive...")
+def load_memory_store():
+    from memory_store import get_memory_store
+    return get_memory_store()
+
+
+def run_ingestion():
+    from ingestion import ingest_documents
+    return ingest_documents()
 
 # --- Page Config ---
 st.set_page_config(page_title="NewsNexus AI", page_icon="📰", layout="wide")
@@ -43,6 +66,25 @@ if "current_step" not in st.session_state:
 if "draft_content" not in st.session_state:
     st.session_state.draft_content = ""
 
+
+def restore_review(thread_id):
+    """Reopens a review paused at human_approval (e.g. before a server restart) from its checkpoint."""
+    config = {"configurable": {"thread_id": thread_id}}
+    state = get_agent_app().get_state(config)
+    if "human_approval" not in state.next:
+        return
+    st.session_state.thread_id = thread_id
+    st.session_state.messages = state.values["messages"][:1]
+    st.session_state.research_data = state.values.get("researcher_data", [])
+    st.session_state.chart_data = state.values.get("chart_data", [])
+    st.session_state.draft_content = state.values.get("draft") or state.values["messages"][-1].content
+    st.session_state.current_step = "reviewing"
+
+
+# The review thread is kept in the URL (?thread=...), so reloading the page resumes it
+if st.session_state.current_step == "idle" and "thread" in st.query_params:
+    restore_review(st.query_params["thread"])
+
 # --- PDF Export Utility ---
 def export_as_pdf(html_content):
     from io import BytesIO
@@ -53,6 +95,104 @@ def export_as_pdf(html_content):
         return None
     return pdf_buffer.getvalue()
 
+# --- Live Token Streaming ---
+class TokenStream:
+    """Renders one agent's streamed LLM tokens into a live container, with time-to-first-token."""
+
+    def __init__(self, container, language=None):
+        self.container = container
+        self.sections = {}
+        self.caption = container.empty()
+        self.placeholder = container.empty()
+        self.language = language
+        self.text = ""
+        self.started = time.perf_counter()
+        self.first_token_at = None
+        self.last_render = 0.0
+
+    def add(self, token):
+        if not token:
+            return
+        now = time.perf_counter()
+        if self.first_token_at is None:
+            self.first_token_at = now
+            self.caption.caption(f"⚡ Time to first token: {now - self.started:.2f}s")
+        self.text += token
+        # Re-render at most ~10x per second; a rerender per token slows the browser down
+        if now - self.last_render > 0.1:
+            self.render()
+            self.last_render = now
+
+    def section(self, index):
+        """Child stream for one concurrently revised section, so their tokens never interleave."""
+        if index not in self.sections:
+            self.container.caption(f"Section {index}")
+            self.sections[index] = TokenStream(self.container, self.language)
+        return self.sections[index]
+
+    def render(self):
+        if self.language:
+            self.placeholder.code(self.text, language=self.language)
+        else:
+            self.placeholder.markdown(self.text)
+
+
+def stream_agents(graph_input, config, token_streams, on_update=None):
+    """
+    Runs the graph with LangGraph's 'updates' + 'messages' stream modes.
+    Tokens from nodes listed in token_streams go to their TokenStream (section
+    revisions to a child stream per section); node updates are passed to
+    on_update(node, output) exactly as app.stream() yields them.
+    """
+    for mode, payload in get_agent_app().stream(graph_input, config, stream_mode=["updates", "messages"]):
+        if mode == "messages":
+            chunk, metadata = payload
+            stream = token_streams.get(metadata.get("langgraph_node"))
+            if stream is not None and metadata.get(SECTION_METADATA_KEY) is not None:
+                stream = stream.section(metadata[SECTION_METADATA_KEY])
+            if stream is not None and isinstance(chunk.content, str):
+                stream.add(chunk.content)
+        else:
+            for node, output in payload.items():
+                # Show the node's final message verbatim (also covers cached, non-streamed responses)
+                stream = token_streams.get(node)
+                if stream is not None and output and output.get("messages"):
+                    stream.text = output["messages"][-1].content
+                    stream.render()
+                # The next node starts now, so time-to-first-token is measured from here
+                for pending in token_streams.values():
+                    if pending.first_token_at is None:
+                        pending.started = time.perf_counter()
+                if on_update is not None:
+                    on_update(node, output)
+
+
+def render_trace_summary(container, node):
+    """Per-node timing breakdown from the tracing spans of the current run."""
+    run_span = tracing.current_span()
+    summary = tracing.summarize(run_span.trace_id, node) if run_span else None
+    if not summary:
+        return
+    lines = [f"⏱️ {summary['duration_ms'] / 1000:.2f}s total"]
+    for tool_name, duration_ms, status in summary["tools"]:
+        lines.append(f"🔧 {tool_name}: {duration_ms / 1000:.2f}s" + ("" if status == "ok" else f" ({status})"))
+    if summary["tool_cache_hits"]:
+        lines.append(f"♻️ {summary['tool_cache_hits']} tool result(s) from the semantic cache")
+    if summary["llm_calls"]:
+        lines.append(
+            f"🤖 LLM: {summary['llm_calls']} call(s), {summary['llm_ms'] / 1000:.2f}s, "
+            f"{summary['input_tokens']} in / {summary['output_tokens']} out tokens, "
+            f"{summary['llm_cache_hits']} cached"
+        )
+    embedded = summary["embedding_cache_hits"] + summary["embedding_cache_misses"]
+    if embedded:
+        lines.append(
+            f"🧮 Embeddings: {summary['embedding_ms'] / 1000:.2f}s, "
+            f"cache {summary['embedding_cache_hits']}/{embedded} hits"
+        )
+    container.caption("  \n".join(lines))
+
+
 # --- Sidebar: Data Management ---
 with st.sidebar:
     st.image("https://cdn-icons-png.flaticon.com/512/2593/2593240.png", width=80)
@@ -93,7 +233,7 @@ with st.sidebar:
         else:
             with st.spinner("Processing Library..."):
                 try:
-                    pages, chunks = ingest_documents() 
+                    pages, chunks = run_ingestion() 
                     st.success(f"Success! Processed {pages} pages into {chunks} chunks.")
                 except Exception as e:
                     st.error(f"Error: {e}")
@@ -105,6 +245,7 @@ with st.sidebar:
     st.info(f"System Status: {status_msg}")
     st.caption(f"Mode: {'Hybrid (PDF+Web)' if existing_pdfs else 'Web Search Only'}")
     st.caption("LLM: Llama 3.2 (768-dim Ollama)")
+    stream_analyst = st.checkbox("Stream Analyst tokens", value=False)
 
 # --- Main Interface ---
 
@@ -125,7 +266,7 @@ if st.button("🚀 Start Agents", disabled=st.session_state.current_step != "idl
     elif raw_pdfs_exist:
         with st.info("🔍 Indexing your library for the first time..."):
             try:
-                pages, chunks = ingest_documents()
+                pages, chunks = run_ingestion()
                 st.success(f"Library Indexed! ({pages} pages, {chunks} chunks)")
             except Exception as e:
                 st.error(f"Auto-index failed: {e}")
@@ -135,12 +276,15 @@ if st.button("🚀 Start Agents", disabled=st.session_state.current_step != "idl
     # -------------------------
 
     st.session_state.current_step = "researching"
+    # Every run gets its own checkpointed thread
+    st.session_state.thread_id = f"session_{int(time.time())}"
+    st.query_params["thread"] = st.session_state.thread_id
     st.session_state.messages = [HumanMessage(content=topic)]
     st.session_state.research_data = []
     
     # Initialize Memory Store
     try:
-        mem_store = MemoryStore()
+        mem_store = load_memory_store()
         with st.spinner("Checking historical archives..."):
             past_memory = mem_store.check_memory(topic)
     except Exception as e:
@@ -165,39 +309,50 @@ if st.session_state.current_step == "researching":
 
     # Run the Graph Stream
     config = {"configurable": {"thread_id": st.session_state.thread_id}}
-    inputs = {"messages": st.session_state.messages, "research_data": [], "chart_data": []}
+    inputs = {"messages": st.session_state.messages, "researcher_data": [], "chart_data": []}
     
+    # Writer (and optionally Analyst) tokens stream into their panels as they are generated
+    token_streams = {"Writer": TokenStream(writer_status, language="html")}
+    if stream_analyst:
+        token_streams["Analyst"] = TokenStream(analyst_status)
+
+    def show_update(node, output):
+        if node == "Researcher":
+            research_output = output
+            st.session_state.research_data = research_output.get("researcher_data", [])
+            with research_status:
+                for item in st.session_state.research_data:
+                    st.markdown(f"--- \n{item}")
+                render_trace_summary(research_status, "Researcher")
+            research_status.update(label=f"Researcher: Found {len(st.session_state.research_data)} items", state="complete", expanded=False)
+            analyst_status.update(expanded=True)
+
+        if node == "Analyst":
+            analyst_output = output
+            st.session_state.chart_data = analyst_output.get("chart_data", [])
+            with analyst_status:
+                st.write("Identified Trends & Extracted Data:")
+                if st.session_state.chart_data:
+                    st.json(st.session_state.chart_data)
+                else:
+                    st.write("No numeric trends found.")
+                render_trace_summary(analyst_status, "Analyst")
+            analyst_status.update(label="Analyst: Complete", state="complete", expanded=False)
+            writer_status.update(expanded=True)
+
+        if node == "Writer":
+            writer_output = output
+            st.session_state.draft_content = writer_output["messages"][-1].content
+            with writer_status:
+                st.success("Draft Generated!")
+                render_trace_summary(writer_status, "Writer")
+            writer_status.update(label="Writer: Complete", state="complete")
+
     try:
         print(f"\n[Streamlit] Starting graph for topic: '{topic}'")
-        for event in agent_app.stream(inputs, config):
-            if "Researcher" in event:
-                research_output = event["Researcher"]
-                st.session_state.research_data = research_output.get("research_data", [])
-                with research_status:
-                    for item in st.session_state.research_data:
-                        st.markdown(f"--- \n{item}")
-                research_status.update(label=f"Researcher: Found {len(st.session_state.research_data)} items", state="complete", expanded=False)
-                analyst_status.update(expanded=True)
-
-            if "Analyst" in event:
-                analyst_output = event["Analyst"]
-                st.session_state.chart_data = analyst_output.get("chart_data", [])
-                with analyst_status:
-                    st.write("Identified Trends & Extracted Data:")
-                    if st.session_state.chart_data:
-                        st.json(st.session_state.chart_data)
-                    else:
-                        st.write("No numeric trends found.")
-                analyst_status.update(label="Analyst: Complete", state="complete", expanded=False)
-                writer_status.update(expanded=True)
-
-            if "Writer" in event:
-                writer_output = event["Writer"]
-                st.session_state.draft_content = writer_output["messages"][-1].content
-                with writer_status:
-                    st.success("Draft Generated!")
-                    st.code(st.session_state.draft_content[:200] + "...", language="html")
-                writer_status.update(label="Writer: Complete", state="complete")
+        # One trace per run; node, tool, embedding and LLM spans nest under it (data/traces.jsonl)
+        with tracing.span("newsletter_run", kind="run", topic=topic):
+            stream_agents(inputs, config, token_streams, show_update)
         
         st.session_state.current_step = "reviewing"
         st.rerun()
@@ -245,16 +400,21 @@ if st.session_state.current_step == "reviewing":
         if st.button("Submit Decision"):
             config = {"configurable": {"thread_id": st.session_state.thread_id}}
             if feedback:
-                agent_app.update_state(config, {"messages": [HumanMessage(content=feedback)]})
-                for event in agent_app.stream(None, config):
-                    pass
-                state = agent_app.get_state(config)
+                get_agent_app().update_state(config, {"messages": [HumanMessage(content=feedback)]})
+                with st.status("✍️ Writer Agent: Revising...", expanded=True) as revision_status:
+                    stream_agents(None, config, {"Writer": TokenStream(revision_status, language="html")})
+                    revision_status.update(label="Writer: Revision complete", state="complete")
+                state = get_agent_app().get_state(config)
                 st.session_state.draft_content = state.values['messages'][-1].content
                 st.session_state.chart_data = state.values.get('chart_data', [])
                 st.rerun()
             else:
+                # Close the thread: human_approval routes the approval to the end of the graph
+                get_agent_app().update_state(config, {"messages": [HumanMessage(content="approve")]})
+                for _ in get_agent_app().stream(None, config):
+                    pass
                 st.session_state.current_step = "finished"
-                mem_store = MemoryStore()
+                mem_store = load_memory_store()
                 topic_key = st.session_state.messages[0].content 
                 mem_store.save_memory(topic_key, st.session_state.draft_content)
                 st.rerun()
@@ -290,6 +450,7 @@ if st.session_state.current_step == "finished":
     with col3:
         if st.button("🔄 New Research"):
             st.session_state.current_step = "idle"
+            st.query_params.clear()
             st.rerun()
 
     st.markdown("### Final Output Preview")
@@ -0,0 +1,146 @@
+import os
+import time
+import threading
+from tracing import current_span
+
+# Configuration (opt-in: set NEWSNEXUS_TOOL_CACHE=1)
+TOOL_CACHE_ENABLED = os.getenv("NEWSNEXUS_TOOL_CACHE", "0") == "1"
+MAX_ENTRIES_PER_TOOL = 256
+
+# Per tool: cosine similarity a cached query needs to count as the same intent,
+# and how long its result stays valid. The PDF library only changes on re-ingestion;
+# web and RSS results go stale much sooner. The thresholds are conservative starting
+# points, not calibrated against labelled query pairs: check stats() and the
+# cache_similarity span attribute for wrong hits before relying on a lower one.
+TOOL_CACHE_POLICY = {
+    "lookup_policy_docs": {"threshold": 0.92, "ttl": 24 * 3600},
+    "web_search_stub": {"threshold": 0.90, "ttl": 3600},
+    "rss_feed_search": {"threshold": 0.93, "ttl": 900},
+}
+DEFAULT_POLICY = {"threshold": 0.95, "ttl": 600}
+
+
+class _ToolEntries:
+    """One tool's cached (query, result, expiry) rows and their normalised query vectors."""
+
+    def __init__(self):
+        self.queries = []
+        self.results = []
+        self.expires = []
+        self.vectors = None   # (n, dim) float32 matrix, row i belongs to entry i
+        self.hits = 0
+        self.misses = 0
+
+
+class SemanticToolCache:
+    """
+    In-memory tool-result cache keyed by query meaning rather than wording.
+    A lookup embeds the query once and takes the most similar unexpired entry
+    of the same tool if it clears that tool's threshold; the oldest entry is
+    evicted past MAX_ENTRIES_PER_TOOL.
+    """
+
+    def __init__(self, embeddings, policy=None, max_entries=MAX_ENTRIES_PER_TOOL):
+        self.embeddings = embeddings
+        self.policy = policy or TOOL_CACHE_POLICY
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.tools = {}
+
+    def _embed(self, query):
+        import numpy as np
+
+        vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) + 1e-12)
+
+    def _drop(self, entries, rows):
+        rows = set(rows)
+        keep = [i for i in range(len(entries.queries)) if i not in rows]
+        entries.queries = [entries.queries[i] for i in keep]
+        entries.results = [entries.results[i] for i in keep]
+        entries.expires = [entries.expires[i] for i in keep]
+        entries.vectors = entries.vectors[keep] if keep else None
+
+    def get_or_compute(self, tool_name, query, compute):
+        """
+        Returns (result, similarity): the cached result of a near-identical query
+        with its cosine similarity, or compute() (stored for later) with None.
+        """
+        import numpy as np
+
+        policy = self.policy.get(tool_name, DEFAULT_POLICY)
+        vector = self._embed(query)
+        tool_span = current_span()
+
+        with self.lock:
+            entries = self.tools.setdefault(tool_name, _ToolEntries())
+            now = time.time()
+            expired = [i for i, expires in enumerate(entries.expires) if expires <= now]
+            if expired:
+                self._drop(entries, expired)
+            if entries.vectors is not None:
+                similarity = entries.vectors @ vector
+                best = int(np.argmax(similarity))
+                if similarity[best] >= policy["threshold"]:
+                    entries.hits += 1
+                    if tool_span is not None:
+                        tool_span.set(cache_hit=True, cache_similarity=round(float(similarity[best]), 4))
+                    return entries.results[best], float(similarity[best])
+            entries.misses += 1
+
+        if tool_span is not None:
+            tool_span.set(cache_hit=False)
+        result = compute()
+
+        with self.lock:
+            entries = self.tools[tool_name]
+            if len(entries.queries) >= self.max_entries:
+                self._drop(entries, [0])
+            entries.queries.append(query)
+            entries.results.append(result)
+            entries.expires.append(time.time() + policy["ttl"])
+            entries.vectors = vector[None, :] if entries.vectors is None else np.vstack([entries.vectors, vector])
+        return result, None
+
+    def clear(self, tool_name=None):
+        """Forgets cached results (of one tool, or all); hit/miss counters are kept."""
+        with self.lock:
+            for name, entries in self.tools.items():
+                if tool_name is None or name == tool_name:
+                    self._drop(entries, range(len(entries.queries)))
+
+    def stats(self):
+        """Hit-rate metrics per tool."""
+        with self.lock:
+            return {
+                name: {
+                    "hits": entries.hits,
+                    "misses": entries.misses,
+                    "hit_rate": round(entries.hits / (entries.hits + entries.misses), 4)
+                    if entries.hits + entries.misses else 0.0,
+                    "entries": len(entries.queries),
+                }
+                for name, entries in self.tools.items()
+            }
+
+
+_tool_cache = None
+_lock = threading.Lock()
+
+
+def get_tool_cache():
+    """Shared semantic tool-result cache, or None when disabled."""
+    global _tool_cache
+    if not TOOL_CACHE_ENABLED:
+        return None
+    with _lock:
+        if _tool_cache is None:
+            from resources import get_embeddings
+            _tool_cache = SemanticToolCache(get_embeddings())
+        return _tool_cache
+
+
+def invalidate_tool_results(tool_name=None):
+    """Clears the shared cache if it was ever created (e.g. PDF lookups after re-ingestion)."""
+    if _tool_cache is not None:
+        _tool_cache.clear(tool_name)
@@ -1,8 +1,14 @@
 import os
-import re
-from langchain.tools import tool
-from langchain_ollama import ChatOllama
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from langchain_core.tools import tool
 from retrieval import retrieve_documents
+from resources import get_chat_model
+from tracing import span
+from tool_cache import get_tool_cache
 
 
 @tool
@@ -51,10 +57,10 @@ def web_search_stub(query: str) -> str:
     Perform a web search using DuckDuckGo and return top 5 results.
     """
 
-    from duckduckgo_search import DDGS
+    from web_search import get_web_search_client
 
-    with DDGS() as ddgs:
-        result = list(ddgs.text(query, max_results=5))
+    # Cached, rate-limited and coalesced with identical in-flight queries
+    result = get_web_search_client().search(query, max_results=5)
 
     if not result:
         return "No results found"
@@ -74,49 +80,172 @@ def web_search_stub(query: str) -> str:
 @tool
 def rss_feed_search(query: str) -> str:
     """
-    Search predefined RSS feeds for articles matching query keywords.
+    Search articles archived from predefined RSS feeds for the query keywords.
     """
 
-    import feedparser
+    from feed_cache import get_feed_cache
+    from article_store import get_article_store
 
-    FEEDS = [
-        "https://www.technologyreview.com/feed/",
-        "https://openai.com/news/rss.xml",
-        "https://techcrunch.com/feed/",
-    ]
+    store = get_article_store()
+
+    # Refresh stale feeds (conditional GETs); new entries are archived by the store
+    get_feed_cache().get_entries()
 
     results = []
-    keywords = set(query.lower().split())
+    for article in store.search(query, k=10):
+        results.append(
+            f"Title: {article['title']}\n"
+            f"Link: {article['link']}"
+        )
 
-    for url in FEEDS:
-        feed = feedparser.parse(url)
+    return "\n\n---\n\n".join(results) if results else "No matching RSS entries found"
 
-        for entry in feed.entries[:10]:
-            text_to_search = (
-                entry.title + " " + entry.get("summary", "")
-            ).lower()
 
-            # safer word matching
-            words = set(re.findall(r"\w+", text_to_search))
+# ----------------------------
+# Concurrent Tool Execution
+# ----------------------------
+# Seconds each tool may take before its finding is reported as a timeout
+TOOL_TIMEOUTS = {
+    "lookup_policy_docs": 60,
+    "web_search_stub": 20,
+    "rss_feed_search": 20,
+}
+DEFAULT_TOOL_TIMEOUT = 30
 
-            if keywords & words:
-                results.append(
-                    f"Title: {entry.title}\n"
-                    f"Link: {entry.link}"
-                )
+# Long-lived pool: a timed-out call keeps its thread until it returns,
+# without blocking the node that dispatched it.
+_tool_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="tool")
 
-    return "\n\n---\n\n".join(results) if results else "No matching RSS entries found"
+
+def _run_started(started, fn, *args):
+    """Runs fn(*args) on a pool thread after recording when it actually started (not when it was queued)."""
+    started.set_result(time.monotonic())
+    return fn(*args)
+
+
+class SharedToolResults:
+    """
+    Tool results shared by every topic of a batch, keyed by (tool, normalised query).
+    Single-flight: concurrent identical calls wait for the first one. Failures are not kept.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._futures = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_run(self, key, fn):
+        with self._lock:
+            future = self._futures.get(key)
+            owner = future is None
+            if owner:
+                future = self._futures[key] = Future()
+                self.misses += 1
+            else:
+                self.hits += 1
+        if owner:
+            try:
+                future.set_result(fn())
+            except Exception as e:
+                with self._lock:
+                    self._futures.pop(key, None)
+                future.set_exception(e)
+        return owner, future.result()
+
+
+_shared_results = ContextVar("newsnexus_shared_tool_results", default=None)
+
+
+@contextmanager
+def shared_tool_results():
+    """Within this block (and threads started from copies of its context) identical tool calls run once."""
+    shared = SharedToolResults()
+    token = _shared_results.set(shared)
+    try:
+        yield shared
+    finally:
+        _shared_results.reset(token)
+
+
+def _cached_invoke(selected, query):
+    """Runs the tool unless the semantic cache holds a result for a near-identical query."""
+    cache = get_tool_cache()
+    if cache is None:
+        return selected.invoke(query)
+    result, _ = cache.get_or_compute(selected.name, query, lambda: selected.invoke(query))
+    return result
+
+
+def _invoke_tool(selected, query):
+    with span(selected.name, kind="tool", query=query) as tool_span:
+        shared = _shared_results.get()
+        if shared is None:
+            result = _cached_invoke(selected, query)
+        else:
+            from web_search import normalize_query
+            owner, result = shared.get_or_run(
+                (selected.name, normalize_query(query)), lambda: _cached_invoke(selected, query)
+            )
+            tool_span.set(shared_hit=not owner)
+        tool_span.set(result_chars=len(str(result)))
+        return result
+
+
+def run_tool_calls(calls):
+    """
+    Run (tool_name, query) pairs concurrently.
+    Returns (tool_name, result) pairs in the same order as `calls`; a tool that
+    fails or exceeds its timeout yields an explanatory result instead.
+    """
+    tools_by_name = {t.name: t for t in (lookup_policy_docs, web_search_stub, rss_feed_search)}
+
+    submitted = time.monotonic()
+    futures = []
+    for tool_name, query in calls:
+        selected = tools_by_name.get(tool_name)
+        if selected is None:
+            futures.append(None)
+            continue
+        # Each call runs in a copy of the caller's context so its span nests under the node span
+        started = Future()
+        future = _tool_executor.submit(copy_context().run, _run_started, started, _invoke_tool, selected, query)
+        futures.append((started, future))
+
+    results = []
+    for (tool_name, _), pending in zip(calls, futures):
+        if pending is None:
+            results.append((tool_name, "Unknown tool"))
+            continue
+
+        # The timeout counts from when the tool starts running, so time spent queued behind
+        # other calls (e.g. from concurrent batch topics) is not charged to it. A call still
+        # queued after its timeout is cancelled.
+        started, future = pending
+        timeout = TOOL_TIMEOUTS.get(tool_name, DEFAULT_TOOL_TIMEOUT)
+        try:
+            start = started.result(timeout=max(0.0, submitted + timeout - time.monotonic()))
+            results.append((tool_name, future.result(timeout=max(0.0, start + timeout - time.monotonic()))))
+        except TimeoutError:
+            future.cancel()
+            results.append((tool_name, f"Tool timed out after {timeout}s, no data returned."))
+        except Exception as e:
+            results.append((tool_name, f"Tool failed: {e}"))
+
+    return results
+
+
+_bound_llm = None  # (chat model, tool-bound model) from the last bind
 
 
 def get_llm_with_tools():
     """
-    Initialize ChatOllama model and bind available tools.
+    Initialize the shared chat model (ChatOllama) and bind available tools.
+    The binding is built on first use and reused while the shared model is unchanged.
     """
+    global _bound_llm
 
-    llm = ChatOllama(
-        model="llama3.2",
-        temperature=0
-    )
+    llm = get_chat_model()
 
     tools = [
         lookup_policy_docs,
@@ -124,6 +253,7 @@ def get_llm_with_tools():
         rss_feed_search
     ]
 
-    llm_with_tools = llm.bind_tools(tools)
+    if _bound_llm is None or _bound_llm[0] is not llm:
+        _bound_llm = (llm, llm.bind_tools(tools))
 
-    return llm_with_tools, tools
\ No newline at end of file
+    return _bound_llm[1], tools
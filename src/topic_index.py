@@ -0,0 +1,272 @@
+import os
+import re
+import json
+import html
+import zlib
+import threading
+from config import data_path
+
+# Configuration (persisted next to archive_memory)
+TOPIC_INDEX_PATH = data_path("topic_index.json")
+
+# MinHash signature = NUM_PERM hashes, split into LSH_BANDS bands of NUM_PERM // LSH_BANDS rows.
+# With 32 bands x 4 rows a pair at Jaccard 0.5 collides in at least one band ~87% of the time.
+NUM_PERM = 128
+LSH_BANDS = 32
+TOPIC_SHINGLE = 4     # character n-grams for short topic strings
+CONTENT_SHINGLE = 3   # word n-grams for newsletter bodies
+
+# Estimated Jaccard at which a topic counts as already covered (no model call needed)
+DUPLICATE_JACCARD = 0.5
+# Cosine similarity of topic embeddings for the fallback path
+# (equivalent to the old 0.4 squared-L2 Chroma distance on unit vectors)
+EMBEDDING_THRESHOLD = 0.8
+
+_MERSENNE_PRIME = (1 << 31) - 1
+TAG_PATTERN = re.compile(r"<(script|style)\b.*?</\1>|<[^>]+>", re.S | re.I)
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def strip_html(text):
+    """Plain text of an HTML newsletter (tags, scripts and styles removed, entities decoded)."""
+    return re.sub(r"\s+", " ", html.unescape(TAG_PATTERN.sub(" ", text))).strip()
+
+
+def topic_shingles(topic):
+    normalized = " ".join(WORD_PATTERN.findall(topic.lower()))
+    if len(normalized) <= TOPIC_SHINGLE:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + TOPIC_SHINGLE] for i in range(len(normalized) - TOPIC_SHINGLE + 1)}
+
+
+def content_shingles(content):
+    words = WORD_PATTERN.findall(strip_html(content).lower())
+    if len(words) <= CONTENT_SHINGLE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + CONTENT_SHINGLE]) for i in range(len(words) - CONTENT_SHINGLE + 1)}
+
+
+class MinHasher:
+    """Universal hashing (a*x + b) mod p over crc32 shingle hashes, NUM_PERM permutations."""
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        import numpy as np
+
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, _MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, _MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+        self.prime = np.uint64(_MERSENNE_PRIME)
+
+    def signature(self, shingles):
+        import numpy as np
+
+        if not shingles:
+            return np.full(len(self.a), _MERSENNE_PRIME, dtype=np.uint64)
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles)
+        )
+        # a < 2^31 and crc32 < 2^32, so the product stays inside uint64
+        permuted = (np.outer(hashes, self.a) + self.b) % self.prime
+        return permuted.min(axis=0)
+
+
+class LSHIndex:
+    """Banded LSH buckets over MinHash signatures: id sets keyed by (band, band hash)."""
+
+    def __init__(self, bands=LSH_BANDS):
+        self.bands = bands
+        self.buckets = {}
+
+    def _keys(self, signature):
+        rows = len(signature) // self.bands
+        return [(band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(self.bands)]
+
+    def add(self, item_id, signature):
+        for key in self._keys(signature):
+            self.buckets.setdefault(key, set()).add(item_id)
+
+    def remove(self, item_id, signature):
+        for key in self._keys(signature):
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.discard(item_id)
+                if not bucket:
+                    del self.buckets[key]
+
+    def candidates(self, signature):
+        found = set()
+        for key in self._keys(signature):
+            found |= self.buckets.get(key, set())
+        return found
+
+
+class TopicIndex:
+    """
+    Near-duplicate index over archived newsletters.
+    Each issue keeps a MinHash of its topic and of its body plus the topic's
+    embedding, so "have we covered this?" is answered from LSH buckets first
+    and from the cached topic embeddings only when no close match exists.
+    Issue records (with their body signature) are persisted; topic signatures
+    and LSH buckets are rebuilt on load.
+    """
+
+    def __init__(self, path=TOPIC_INDEX_PATH):
+        self.path = path
+        self.hasher = MinHasher()
+        self.issues = {}            # id -> {"topic", "timestamp", "created_at", "snippet", "embedding", "content_signature"}
+        self.topic_signatures = {}
+        self.content_signatures = {}
+        self.topic_lsh = LSHIndex()
+        self.content_lsh = LSHIndex()
+        self._lock = threading.RLock()
+        self._matrix = None         # (ids, normalised topic embeddings, created_at), rebuilt after changes
+
+    @classmethod
+    def load(cls, path=TOPIC_INDEX_PATH):
+        index = cls(path)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+            for issue_id, issue in stored["issues"].items():
+                index._add_one(issue_id, issue)
+        return index
+
+    def save(self):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"issues": self.issues}, f)
+            os.replace(tmp_path, self.path)
+
+    def __len__(self):
+        return len(self.issues)
+
+    def __contains__(self, issue_id):
+        return issue_id in self.issues
+
+    def _add_one(self, issue_id, issue):
+        import numpy as np
+
+        if issue_id in self.issues:
+            self.remove([issue_id])
+        self.issues[issue_id] = issue
+        topic_sig = self.hasher.signature(topic_shingles(issue["topic"]))
+        content_sig = np.asarray(issue["content_signature"], dtype=np.uint64)
+        self.topic_signatures[issue_id] = topic_sig
+        self.content_signatures[issue_id] = content_sig
+        self.topic_lsh.add(issue_id, topic_sig)
+        self.content_lsh.add(issue_id, content_sig)
+        self._matrix = None
+
+    def add(self, issue_id, topic, content, timestamp, embedding, created_at=0.0):
+        """
+        Indexes one archived issue; `embedding` is the topic's embed_query() vector,
+        `timestamp` the display date and `created_at` the same instant as epoch seconds.
+        """
+        issue = {
+            "topic": topic,
+            "timestamp": timestamp,
+            "created_at": created_at,
+            "snippet": strip_html(content)[:300],
+            "embedding": list(embedding),
+            "content_signature": self.hasher.signature(content_shingles(content)).tolist(),
+        }
+        with self._lock:
+            self._add_one(issue_id, issue)
+
+    def remove(self, ids):
+        with self._lock:
+            for issue_id in ids:
+                if issue_id not in self.issues:
+                    continue
+                del self.issues[issue_id]
+                self.topic_lsh.remove(issue_id, self.topic_signatures.pop(issue_id))
+                self.content_lsh.remove(issue_id, self.content_signatures.pop(issue_id))
+            self._matrix = None
+
+    def created_at(self):
+        """(issue id, created_at) for every indexed issue, oldest first."""
+        with self._lock:
+            return sorted(
+                ((issue_id, issue.get("created_at", 0.0)) for issue_id, issue in self.issues.items()),
+                key=lambda item: item[1],
+            )
+
+    def _summary(self, issue_id):
+        issue = self.issues[issue_id]
+        return {
+            "id": issue_id,
+            "topic": issue["topic"],
+            "timestamp": issue["timestamp"],
+            "created_at": issue.get("created_at", 0.0),
+            "snippet": issue["snippet"],
+        }
+
+    def _ranked(self, signature, lsh, signatures, n, since=None):
+        import numpy as np
+
+        scored = [
+            (issue_id, float(np.mean(signatures[issue_id] == signature)))
+            for issue_id in lsh.candidates(signature)
+            if since is None or self.issues[issue_id].get("created_at", 0.0) >= since
+        ]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:n]
+
+    def _embedding_matrix(self):
+        import numpy as np
+
+        if self._matrix is None:
+            ids = list(self.issues)
+            vectors = np.asarray([self.issues[i]["embedding"] for i in ids], dtype=np.float32)
+            if len(ids):
+                vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+            created = np.asarray([self.issues[i].get("created_at", 0.0) for i in ids], dtype=np.float64)
+            self._matrix = (ids, vectors, created)
+        return self._matrix
+
+    def find_similar(self, topic, n=3, embed_query=None, since=None):
+        """
+        Returns up to n (issue, score, method) triples, best first.
+        method is "minhash" (score = estimated Jaccard of topic shingles) or
+        "embedding" (score = cosine similarity of topic embeddings). The
+        embedding path runs only when no LSH candidate reaches DUPLICATE_JACCARD
+        and an `embed_query(text)` callable is given.
+        `since` (epoch seconds) restricts matches to issues archived from then on.
+        """
+        import numpy as np
+
+        with self._lock:
+            if not self.issues:
+                return []
+            signature = self.hasher.signature(topic_shingles(topic))
+            lexical = self._ranked(signature, self.topic_lsh, self.topic_signatures, n, since)
+            if (lexical and lexical[0][1] >= DUPLICATE_JACCARD) or embed_query is None:
+                return [(self._summary(i), score, "minhash") for i, score in lexical]
+            ids, vectors, created = self._embedding_matrix()
+
+        query = np.asarray(embed_query(topic), dtype=np.float32)
+        query /= np.linalg.norm(query) + 1e-12
+        similarity = vectors @ query
+        if since is not None:
+            similarity[created < since] = -np.inf
+        top = [row for row in np.argsort(-similarity)[:n] if np.isfinite(similarity[row])]
+
+        with self._lock:
+            results = {i: (score, "minhash") for i, score in lexical}
+            for row in top:
+                issue_id, score = ids[row], float(similarity[row])
+                if issue_id in self.issues and score > results.get(issue_id, (-1.0,))[0]:
+                    results[issue_id] = (score, "embedding")
+            ranked = sorted(results.items(), key=lambda item: item[1][0], reverse=True)[:n]
+            return [(self._summary(i), score, method) for i, (score, method) in ranked]
+
+    def find_similar_content(self, content, n=3):
+        """Archived issues whose body is a near-duplicate of `content`: (issue, estimated Jaccard) pairs."""
+        with self._lock:
+            signature = self.hasher.signature(content_shingles(content))
+            return [
+                (self._summary(i), score)
+                for i, score in self._ranked(signature, self.content_lsh, self.content_signatures, n)
+            ]
@@ -0,0 +1,178 @@
+import os
+import json
+import time
+import uuid
+import threading
+import functools
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from config import data_path
+
+# Configuration (NEWSNEXUS_TRACING=0 turns span export off)
+TRACING_ENABLED = os.getenv("NEWSNEXUS_TRACING", "1") == "1"
+TRACE_PATH = data_path("traces.jsonl")
+# Past this size the file is rotated to traces.jsonl.1 (replacing the previous one),
+# so at most ~2x TRACE_MAX_BYTES of spans are kept on disk
+TRACE_MAX_BYTES = int(os.getenv("NEWSNEXUS_TRACE_MAX_MB", "50")) * 1024 * 1024
+RECENT_SPANS = 5000
+
+_current_span = contextvars.ContextVar("newsnexus_current_span", default=None)
+_recent = deque(maxlen=RECENT_SPANS)
+_write_lock = threading.Lock()
+
+
+class Span:
+    """One timed operation. Field names follow the OpenTelemetry span data model."""
+
+    def __init__(self, name, kind, parent, attributes):
+        self.name = name
+        self.kind = kind
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_span_id = parent.span_id if parent else None
+        self.attributes = dict(attributes)
+        self.status = "ok"
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    @property
+    def duration_ms(self):
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def add(self, key, amount=1):
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+def current_span():
+    return _current_span.get()
+
+
+def _export(finished):
+    _recent.append(finished)
+    if not TRACING_ENABLED:
+        return
+    line = json.dumps(finished.to_dict(), default=str)
+    with _write_lock:
+        os.makedirs(os.path.dirname(TRACE_PATH), exist_ok=True)
+        with open(TRACE_PATH, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+            size = f.tell()
+        if size > TRACE_MAX_BYTES:
+            try:
+                os.replace(TRACE_PATH, TRACE_PATH + ".1")
+            except OSError:  # another process has it open (Windows); retried on the next span
+                pass
+
+
+@contextmanager
+def span(name, kind="internal", **attributes):
+    """Times the block as a child of the current span (or as a new trace) and exports it to TRACE_PATH."""
+    new_span = Span(name, kind, _current_span.get(), attributes)
+    token = _current_span.set(new_span)
+    try:
+        yield new_span
+    except Exception as e:
+        new_span.status = "error"
+        new_span.set(error=str(e))
+        raise
+    finally:
+        new_span.end_ns = time.time_ns()
+        _current_span.reset(token)
+        _export(new_span)
+
+
+def traced_node(name):
+    """Decorator wrapping a LangGraph node in a 'node' span."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, kind="node"):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def traced_invoke(llm, llm_input, name="llm"):
+    """
+    llm.invoke() inside an 'llm' span carrying token counts (cache hits are added by llm_cache)
+    and the time spent waiting for an LLM concurrency slot.
+    """
+    from resources import llm_slot
+
+    with span(name, kind="llm") as llm_span:
+        queued = time.perf_counter()
+        with llm_slot():
+            llm_span.set(queue_ms=round((time.perf_counter() - queued) * 1000, 3))
+            response = llm.invoke(llm_input)
+        usage = getattr(response, "usage_metadata", None) or {}
+        metadata = getattr(response, "response_metadata", None) or {}
+        llm_span.set(
+            input_tokens=usage.get("input_tokens", metadata.get("prompt_eval_count", 0)),
+            output_tokens=usage.get("output_tokens", metadata.get("eval_count", 0)),
+            tool_calls=len(getattr(response, "tool_calls", None) or []),
+        )
+        return response
+
+
+def get_spans(trace_id):
+    return [s for s in list(_recent) if s.trace_id == trace_id]
+
+
+def descendants(root):
+    """Every recorded span below `root` in its trace."""
+    children = {}
+    for s in get_spans(root.trace_id):
+        children.setdefault(s.parent_span_id, []).append(s)
+    found, stack = [], [root.span_id]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child.span_id)
+    return found
+
+
+def summarize(trace_id, node_name):
+    """
+    Aggregates the latest `node_name` span of a trace and everything under it:
+    duration, per-tool timings, LLM calls/tokens and cache hits.
+    """
+    spans = get_spans(trace_id)
+    nodes = [s for s in spans if s.kind == "node" and s.name == node_name]
+    if not nodes:
+        return None
+    node = nodes[-1]
+    below = descendants(node)
+
+    llm_spans = [s for s in below if s.kind == "llm"]
+    embed_spans = [s for s in below if s.kind == "embedding"]
+    return {
+        "duration_ms": node.duration_ms,
+        "tools": [(s.name, s.duration_ms, s.status) for s in below if s.kind == "tool"],
+        "tool_cache_hits": sum(1 for s in below if s.kind == "tool" and s.attributes.get("cache_hit")),
+        "llm_calls": len(llm_spans),
+        "llm_ms": sum(s.duration_ms for s in llm_spans),
+        "input_tokens": sum(s.attributes.get("input_tokens", 0) for s in llm_spans),
+        "output_tokens": sum(s.attributes.get("output_tokens", 0) for s in llm_spans),
+        "llm_cache_hits": sum(1 for s in llm_spans if s.attributes.get("cache_hit")),
+        "embedding_ms": sum(s.duration_ms for s in embed_spans),
+        "embedding_cache_hits": sum(s.attributes.get("cache_hits", 0) for s in embed_spans),
+        "embedding_cache_misses": sum(s.attributes.get("cache_misses", 0) for s in embed_spans),
+    }
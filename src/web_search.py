@@ -0,0 +1,147 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from concurrent.futures import Future
+from config import data_path
+
+# Configuration
+WEB_CACHE_PATH = data_path("web_search_cache.sqlite")
+WEB_CACHE_TTL = 6 * 60 * 60   # seconds a cached result set stays valid
+RATE_PER_SECOND = 0.5         # sustained searches per second against the backend
+RATE_BURST = 3
+
+
+def normalize_query(query):
+    """Lowercased, punctuation-free, order-insensitive form used as the cache key."""
+    return " ".join(sorted(set(re.findall(r"\w+", query.lower()))))
+
+
+class DuckDuckGoBackend:
+    """Live DuckDuckGo text search."""
+
+    def search(self, query, max_results):
+        from duckduckgo_search import DDGS
+
+        with DDGS() as ddgs:
+            return list(ddgs.text(query, max_results=max_results))
+
+
+class TokenBucket:
+    """Blocking token-bucket rate limiter."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class WebSearchClient:
+    """
+    Web search with a persistent TTL cache on the normalised query, a token
+    bucket in front of the backend, and single-flight coalescing: concurrent
+    identical queries share one backend call.
+    """
+
+    def __init__(self, backend=None, cache_path=WEB_CACHE_PATH, ttl=WEB_CACHE_TTL,
+                 rate=RATE_PER_SECOND, burst=RATE_BURST):
+        self.backend = backend or DuckDuckGoBackend()
+        self.ttl = ttl
+        self.bucket = TokenBucket(rate, burst)
+        self.lock = threading.Lock()
+        self.inflight = {}
+        self.hits = 0
+        self.misses = 0
+
+        if os.path.dirname(cache_path):
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        self.conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS web_results ("
+            " key TEXT PRIMARY KEY, results TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    def _cached(self, key):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT results FROM web_results WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _store(self, key, results):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO web_results (key, results, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(results), time.time() + self.ttl),
+            )
+            self.conn.execute("DELETE FROM web_results WHERE expires_at <= ?", (time.time(),))
+            self.conn.commit()
+
+    def search(self, query, max_results=5):
+        """Returns a list of {title, href, body} dicts."""
+        key = f"{max_results}:{normalize_query(query)}"
+
+        cached = self._cached(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        with self.lock:
+            future = self.inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self.inflight[key] = future
+
+        if not leader:
+            self.hits += 1
+            return future.result()
+
+        self.misses += 1
+        try:
+            self.bucket.acquire()
+            results = self.backend.search(query, max_results)
+            self._store(key, results)
+            future.set_result(results)
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+        return future.result()
+
+
+_client = None
+_lock = threading.Lock()
+
+
+def get_web_search_client():
+    """Process-wide web search client (DuckDuckGo unless a backend was set)."""
+    global _client
+    with _lock:
+        if _client is None:
+            _client = WebSearchClient()
+        return _client
+
+
+def set_web_search_backend(backend):
+    """Swaps the search backend, e.g. for a local fake in tests and benchmarks."""
+    get_web_search_client().backend = backend